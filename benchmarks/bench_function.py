@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+"""
+Declarations/s of the full AST walk against the scoped walk used by Function.find_function.
+
+    $ python benchmarks/bench_function.py [HEADER ...]
+"""
+import glob
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(os.path.dirname(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+# modules read config.ini from the working directory at import time
+os.chdir(os.path.join(ROOT, "tests"))
+
+from component import Component  # noqa: E402
+from function import Function  # noqa: E402
+
+
+def bench(name, headers, fast):
+    Function.fast = fast
+    function = Function()
+    found = dict()
+    start = time.perf_counter()
+    for path in headers:
+        found[path] = set(function.find_function(path))
+    elapsed = time.perf_counter() - start
+    total = sum(len(i) for i in found.values())
+    print(f"{name:<16}{total:>8} decls{elapsed:>10.2f} s{total / elapsed:>10.1f} decl/s")
+    return found
+
+
+def main():
+    headers = [os.path.abspath(i) for i in sys.argv[1:]]
+    if not headers:
+        headers = sorted(glob.glob("/usr/include/c++/*/bits/stl_*.h"))
+    # resolve components without MongoDB
+    Component.mapping = dict()
+    full = bench("full_walk", headers, False)
+    scoped = bench("scoped_walk", headers, True)
+    for path in headers:
+        if full[path] != scoped[path]:
+            print(f"{path}: only in full_walk {sorted(full[path] - scoped[path])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+"""
+Benchmark of Process.pre_process against the original regex parser kept in tests/test_process.py.
+
+    $ python benchmarks/bench_process.py
+"""
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.join(ROOT, "tests"))
+
+from process import Process  # noqa: E402
+from test_process import parse, random_frame, reference_pre_process  # noqa: E402
+
+
+def well_formed(rng, frames, tail):
+    lines = ["[BUILD]", "version 2.00", "[CRASH_STACK]  Stacktrace of crash: (2020-01-01 10:00:00)",
+             "----> Symbolic stack backtrace <----"]
+    for number in range(frames):
+        lines += random_frame(rng, number)
+        lines.append("-" * 40)
+    lines.append("[CRASH_REGISTERS]")
+    # registers, memory maps and thread dumps following the crash stack
+    lines += ["rax: 0x0 rbx: 0x0 rcx: 0x0 rdx: 0x0"] * tail
+    return "head\n" + "\n".join(lines) + "\n"
+
+
+def bench(name, dumps, number=1):
+    for label, func in (("reference", reference_pre_process), ("Process", lambda i: Process(i).pre_process())):
+        start = time.perf_counter()
+        for _ in range(number):
+            for dump in dumps:
+                parse(func(dump))
+        elapsed = time.perf_counter() - start
+        print(f"{name + ', ' + label:<36}{elapsed / number * 1e3:>10.1f} ms")
+
+
+def main():
+    rng = random.Random(0)
+    bench("corpus of 200 dumps", [well_formed(rng, rng.randint(10, 60), 2000) for _ in range(200)], 3)
+    bench("large tail (50 MB)", [well_formed(rng, 40, 1_400_000)])
+    # frame lines followed by long dash-free blocks
+    bench("worst case", ["head\n[CRASH_STACK]\n" + ("-\n 1: " + "f" * 2000 + "\n" + "a" * 2000 + "\n") * 500
+                         + "[CRASH_REGISTERS]\n"])
+
+
+if __name__ == "__main__":
+    main()
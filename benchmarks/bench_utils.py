@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+"""
+Microbenchmark of DP against the original implementations kept in tests/test_utils.py.
+
+    $ python benchmarks/bench_utils.py
+"""
+import os
+import random
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.join(ROOT, "tests"))
+
+from test_utils import reference_lcs_position, reference_normalized_dist  # noqa: E402
+from utils import DP  # noqa: E402
+
+
+def sequences(rng, length, alphabet):
+    return [rng.choice(alphabet) for _ in range(length)]
+
+
+def bench(name, func, pairs, number):
+    elapsed = timeit.timeit(lambda: [func(a, b) for a, b in pairs], number=number)
+    print(f"{name:<36}{elapsed / number / len(pairs) * 1e6:>10.1f} us/pair")
+
+
+def main():
+    rng = random.Random(0)
+    # cpnt_order lengths seen in crash stacks
+    for length in (20, 60):
+        pairs = [(sequences(rng, length, "ABCDEFGH"), sequences(rng, length, "ABCDEFGH")) for _ in range(50)]
+        print(f"lcs_position, length {length}")
+        bench("  reference", reference_lcs_position, pairs, 3)
+        bench("  DP.lcs_position", DP.lcs_position, pairs, 3)
+    # func_block token lengths
+    for length in (10, 40):
+        pairs = [(sequences(rng, length, "abcdefghijklmnop"), sequences(rng, length, "abcdefghijklmnop"))
+                 for _ in range(200)]
+        print(f"normalized_dist, length {length}")
+        bench("  reference", reference_normalized_dist, pairs, 3)
+        bench("  DP.normalized_dist", DP.normalized_dist, pairs, 3)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import configparser
+import hashlib
+import json
+import os
+import sqlite3
+import subprocess
+import time
+import zlib
+
+from pool import MongoConnection
+
+
+class DumpCache:
+    """
+    Content-addressed on-disk cache of cpnt_order, func_block obtained from crash dumps,
+    keyed by the crash dump and the version of component knowledge.
+    Attributes:
+        version: The knowledge version computed per process, loaded lazily.
+        connection: The SQLite connection opened per process, loaded lazily.
+    """
+    config = configparser.ConfigParser()
+    config_path = os.path.join(os.getcwd(), "config.ini")
+    config.read(config_path)
+    # MongoDB
+    host = config.get("mongodb", "host")
+    port = config.getint("mongodb", "port")
+    # Stop
+    stop_words = set(config.get("stop", "words").split())
+    # Cache
+    cache_path = config.get("cache", "path", fallback="")
+    cache_size = config.getint("cache", "size", fallback=512) * 1024 * 1024
+    version = None
+    connection = None
+
+    def open_cache(self):
+        """
+        Open the cache database once per process if a cache path is configured.
+        Returns:
+            The SQLite connection, or None if disabled.
+        """
+        if DumpCache.connection is None and self.cache_path:
+            connection = sqlite3.connect(self.cache_path)
+            connection.execute("CREATE TABLE IF NOT EXISTS dump "
+                               "(key TEXT PRIMARY KEY, value BLOB, size INTEGER, used REAL)")
+            connection.execute("CREATE INDEX IF NOT EXISTS dump_used ON dump (used)")
+            DumpCache.connection = connection
+        return DumpCache.connection
+
+    def knowledge_version(self):
+        """
+        Obtain the knowledge version from the commit of code base, the stop words and the counter in database.
+        Returns:
+            The hexadecimal knowledge version.
+        """
+        if DumpCache.version is None:
+            git_root = "hana"
+            pipe = subprocess.run(["git", "-C", git_root, "rev-parse", "HEAD"],
+                                  stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            with MongoConnection(self.host, self.port) as mongo:
+                meta = mongo.connection["kdetector"]["meta"].find_one({"_id": "knowledge"})
+            sha1 = hashlib.sha1()
+            sha1.update(pipe.stdout.strip())
+            sha1.update(" ".join(sorted(self.stop_words)).encode("utf-8"))
+            sha1.update(str(meta["version"] if meta else 0).encode("utf-8"))
+            DumpCache.version = sha1.hexdigest()
+        return DumpCache.version
+
+    @staticmethod
+    def bump_version(database):
+        """
+        Increase the knowledge counter in database, which invalidates all cached entries.
+        Args:
+            database: The kdetector database.
+        """
+        database["meta"].update_one({"_id": "knowledge"}, {"$inc": {"version": 1}}, upsert=True)
+        DumpCache.version = None
+
+    def key(self, dump, internal):
+        """
+        Obtain the cache key of a crash dump.
+        Args:
+            dump: The crash dump (or its crash stack) string.
+            internal: Whether it is an internal crash dump.
+        Returns:
+            The hexadecimal cache key, or None if disabled.
+        """
+        if not self.cache_path:
+            return None
+        sha1 = hashlib.sha1()
+        sha1.update(self.knowledge_version().encode("utf-8"))
+        sha1.update(b"internal\0" if internal else b"external\0")
+        sha1.update(dump.encode("utf-8"))
+        return sha1.hexdigest()
+
+    def get_many(self, keys):
+        """
+        Obtain cached cpnt_order, func_block and mark them as recently used.
+        Args:
+            keys: The cache keys.
+        Returns:
+            ret: The key/(cpnt_order, func_block) mapping of cached entries.
+        """
+        ret = dict()
+        connection = self.open_cache()
+        keys = [i for i in keys if i is not None]
+        if connection is None or not keys:
+            return ret
+        # stay within the host parameter limit of SQLite
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i+500]
+            marks = ",".join("?" * len(chunk))
+            for key, value in connection.execute(f"SELECT key, value FROM dump WHERE key IN ({marks})", chunk):
+                cpnt_order, func_block = json.loads(zlib.decompress(value))
+                ret[key] = cpnt_order, func_block
+        if ret:
+            with connection:
+                connection.executemany("UPDATE dump SET used = ? WHERE key = ?",
+                                       [(time.time(), key) for key in ret])
+        return ret
+
+    def put_many(self, entries):
+        """
+        Store cpnt_order, func_block into cache, evicting least recently used entries beyond the size limit.
+        Args:
+            entries: The key/(cpnt_order, func_block) mapping.
+        """
+        connection = self.open_cache()
+        if connection is None or not entries:
+            return
+        rows = []
+        for key, value in entries.items():
+            if key is None:
+                continue
+            blob = zlib.compress(json.dumps(value, separators=(",", ":")).encode("utf-8"))
+            rows.append((key, blob, len(blob), time.time()))
+        with connection:
+            connection.executemany("INSERT OR REPLACE INTO dump VALUES (?, ?, ?, ?)", rows)
+            total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM dump").fetchone()[0]
+            # evict least recently used
+            if total > self.cache_size:
+                evicted = []
+                for key, size in connection.execute("SELECT key, size FROM dump ORDER BY used").fetchall():
+                    if total <= self.cache_size:
+                        break
+                    evicted.append((key,))
+                    total -= size
+                connection.executemany("DELETE FROM dump WHERE key = ?", evicted)
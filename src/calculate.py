@@ -1,5 +1,6 @@
 import configparser
 import math
+import numpy as np
 import os
 
 from log import Log
@@ -36,6 +37,53 @@ class Calculate:
             distances.append(DP().normalized_dist(self.block_pair[0][i], self.block_pair[1][j]))
         return list(zip(positions, distances))
 
+    @staticmethod
+    def upper_bound(position_pair, max_len, m=m):
+        """
+        Calculate the similarity upper bound without running the dynamic programming.
+        Args:
+            position_pair: The positions of shared components within crash dump pair.
+            max_len: The longer length of 2 component sequences.
+            m: The parameter for component position.
+        Returns:
+            The upper bound of similarity, valid for non-negative parameters.
+        """
+        numerator = denominator = 0.0
+        # the k-th matched pair lies no earlier than the k-th shared positions on both sides
+        for i, j in zip(sorted(position_pair[0]), sorted(position_pair[1])):
+            numerator += math.exp(-m * max(i, j))
+        for i in range(max_len):
+            denominator += math.exp(-m * i)
+        return numerator / denominator
+
+    @staticmethod
+    def grid_sim(features, max_lens, ms, ns):
+        """
+        Calculate the similarity of many crash dump pairs under every parameter combination at once.
+        Args:
+            features: Feature values of position and distance for each crash dump pair.
+            max_lens: The longer length of 2 component sequences for each crash dump pair.
+            ms: The candidates for component position parameter.
+            ns: The candidates for component distance parameter.
+        Returns:
+            The similarity results shaped (len(ms), len(ns), len(features)).
+        """
+        ms, ns = np.asarray(ms, dtype=float), np.asarray(ns, dtype=float)
+        counts = np.array([len(feature) for feature in features], dtype=int)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(int)
+        flat = np.array([pair for feature in features for pair in feature], dtype=float).reshape(-1, 2)
+        pos, dist = flat[:, 0], flat[:, 1]
+        # numerator, summed per crash dump pair
+        numerator = np.zeros((len(ms), len(ns), len(features)))
+        if len(flat):
+            exp_n = np.exp(-np.outer(ns, dist))
+            for i, m in enumerate(ms):
+                numerator[i][:, counts > 0] = np.add.reduceat(np.exp(-m * pos) * exp_n, starts[counts > 0], axis=1)
+        # denominator, looked up by the longer length
+        max_lens = np.asarray(max_lens, dtype=int)
+        denominator = np.cumsum(np.exp(-np.outer(ms, np.arange(max_lens.max()))), axis=1)[:, max_lens - 1]
+        return numerator / denominator[:, np.newaxis, :]
+
     def calculate_sim(self, m=m, n=n, debug=False):
         """
         Calculate the crash dump similarity under current parameters.
@@ -4,13 +4,18 @@ import os
 import re
 import subprocess
 
-from collections import deque
+from cache import DumpCache
+from collections import defaultdict, deque
 from pool import MongoConnection
+from schema import Schema
 
 
 class Component:
     """
     Obtain Component-File mapping based on the layered CMakeLists.txt.
+    Attributes:
+        mapping: The Component-File mapping cached per process, loaded lazily.
+        locations: The basename/paths index cached per process, loaded lazily.
     """
     config = configparser.ConfigParser()
     config_path = os.path.join(os.getcwd(), "config.ini")
@@ -20,6 +25,8 @@ class Component:
     port = config.getint("mongodb", "port")
     # Git
     git_url = config.get("git", "url")
+    mapping = None
+    locations = None
 
     @staticmethod
     def find_component(path):
@@ -75,6 +82,8 @@ class Component:
         cmd = f"git clone --branch master --depth 1 {self.git_url} {git_root}"
         subprocess.call(cmd.split(" "))
         component_map = dict()
+        locations = defaultdict(list)
+        locations[git_root].append(git_root)
         queue = deque([git_root])
         # BFS
         while queue:
@@ -85,8 +94,10 @@ class Component:
                 component_map.update(self.convert_path(components, prefix))
             for node in os.listdir(prefix):
                 item = os.path.join(prefix, node)
+                locations[node].append(item)
                 if os.path.isdir(item):
                     queue.append(item)
+        previous = self.load_mapping()
         # insert documents
         documents = []
         for key in sorted(component_map.keys()):
@@ -95,30 +106,92 @@ class Component:
             data["component"] = component_map[key]
             documents.append(data)
         with MongoConnection(self.host, self.port) as mongo:
-            collection = mongo.connection["kdetector"]["component"]
-            collection.drop()
-            collection.insert_many(documents)
+            database = mongo.connection["kdetector"]
+            # build aside and swap in, so readers never see a partial mapping
+            database["component_build"].drop()
+            database["component_build"].insert_many(documents)
+            Schema().swap(database, "component")
+            # invalidate cached crash dumps on knowledge change
+            if component_map != previous:
+                DumpCache.bump_version(database)
+        # invalidate cached mapping
+        Component.mapping = component_map
         print(f"\x1b[32mSuccessfully updated Component-File mapping ({len(documents)}).\x1b[0m")
+        self.update_location(locations)
+
+    def update_location(self, locations):
+        """
+        Load the basename/paths index of code base into database.
+        Args:
+            locations: The basename/paths index collected during BFS.
+        """
+        previous = self.load_location()
+        documents = []
+        for key in sorted(locations.keys()):
+            data = dict()
+            data["name"] = key
+            data["paths"] = sorted(locations[key])
+            documents.append(data)
+        with MongoConnection(self.host, self.port) as mongo:
+            database = mongo.connection["kdetector"]
+            # build aside and swap in, so readers never see a partial mapping
+            database["basename_build"].drop()
+            database["basename_build"].insert_many(documents)
+            Schema().swap(database, "basename")
+            # invalidate cached crash dumps on knowledge change
+            if {data["name"]: data["paths"] for data in documents} != previous:
+                DumpCache.bump_version(database)
+        # invalidate cached index
+        Component.locations = {data["name"]: data["paths"] for data in documents}
+        print(f"\x1b[32mSuccessfully updated basename index ({len(documents)}).\x1b[0m")
+
+    def load_mapping(self):
+        """
+        Load the whole component collection into memory once per process.
+        Returns:
+            The Component-File mapping.
+        """
+        if Component.mapping is None:
+            with MongoConnection(self.host, self.port) as mongo:
+                collection = mongo.connection["kdetector"]["component"]
+                cursor = collection.find({}, {"_id": 0, "path": 1, "component": 1})
+                Component.mapping = {data["path"]: data["component"] for data in cursor}
+        return Component.mapping
+
+    def load_location(self):
+        """
+        Load the whole basename index into memory once per process.
+        Returns:
+            The basename/paths index.
+        """
+        if Component.locations is None:
+            with MongoConnection(self.host, self.port) as mongo:
+                collection = mongo.connection["kdetector"]["basename"]
+                cursor = collection.find({}, {"_id": 0, "name": 1, "paths": 1})
+                Component.locations = {data["name"]: data["paths"] for data in cursor}
+        return Component.locations
+
+    def locate(self, name):
+        """
+        Obtain all paths in code base with the given basename, the same as "find -name".
+        Args:
+            name: A base name.
+        Returns:
+            The matched paths.
+        """
+        return self.load_location().get(name, [])
 
     def best_matched(self, path):
         """
-        Query the component collection to obtain the best matched component.
+        Look up the longest path prefix in component mapping to obtain the best matched component.
         Args:
             path: A absolute path is the stack frame.
         Returns:
             matched: The best matched component.
         """
-        matched = "UNKNOWN"
-        with MongoConnection(self.host, self.port) as mongo:
-            collection = mongo.connection["kdetector"]["component"]
-            data = collection.find_one({"path": path})
-            if not data:
-                while "/" in path:
-                    path = path[:path.rindex("/")]
-                    data = collection.find_one({"path": path})
-                    if data:
-                        matched = data["component"]
-                        break
-            else:
-                matched = data["component"]
+        mapping = self.load_mapping()
+        # strip one path segment at a time
+        while path not in mapping and "/" in path:
+            path = path[:path.rindex("/")]
+        matched = mapping.get(path, "UNKNOWN")
         return matched
@@ -0,0 +1,120 @@
+import configparser
+import json
+import os
+import subprocess
+
+from collections import OrderedDict
+
+
+class Demangler:
+    """
+    Demangle C++ symbols in batch via as few c++filt calls as possible, behind a bounded LRU cache.
+    Attributes:
+        cache: The mangled/demangled mapping cached per process in least recently used order.
+        recent: The mapping demangled since last drained, used to merge caches of worker processes.
+    """
+    config = configparser.ConfigParser()
+    config_path = os.path.join(os.getcwd(), "config.ini")
+    config.read(config_path)
+    # Demangle
+    cache_size = config.getint("demangle", "cache_size", fallback=100000)
+    cache_path = config.get("demangle", "cache_path", fallback="")
+    cache = None
+    recent = dict()
+    # well below ARG_MAX, which also counts environment variables
+    arg_limit = 128 * 1024
+
+    def load_cache(self):
+        """
+        Load the demangling cache once per process, optionally from disk.
+        Returns:
+            The mangled/demangled mapping.
+        """
+        if Demangler.cache is None:
+            Demangler.cache = OrderedDict()
+            if self.cache_path and os.path.exists(self.cache_path):
+                with open(self.cache_path, "r", encoding="utf-8") as fp:
+                    Demangler.cache.update(json.load(fp)[-self.cache_size:])
+        return Demangler.cache
+
+    def save_cache(self):
+        """
+        Persist the demangling cache to disk if a cache path is configured.
+        """
+        if not self.cache_path or Demangler.cache is None:
+            return
+        temp_path = f"{self.cache_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as fp:
+            json.dump(list(Demangler.cache.items()), fp)
+        os.replace(temp_path, self.cache_path)
+
+    def drain_recent(self):
+        """
+        Obtain and clear the mapping demangled since last drained.
+        Returns:
+            recent: The recently demangled mapping.
+        """
+        recent, Demangler.recent = Demangler.recent, dict()
+        return recent
+
+    def merge_cache(self, mapping):
+        """
+        Merge a mangled/demangled mapping, e.g., from worker processes, into the cache.
+        Args:
+            mapping: The mangled/demangled mapping.
+        """
+        cache = self.load_cache()
+        cache.update(mapping)
+        # evict least recently used
+        while len(cache) > self.cache_size:
+            cache.popitem(last=False)
+
+    @staticmethod
+    def batches(symbols):
+        """
+        Split symbols into batches whose command line arguments stay within the size limit.
+        Args:
+            symbols: The mangled symbols.
+        Returns:
+            The batches composed of symbol and its arguments, generated one by one.
+        """
+        batch, size = [], 0
+        for symbol in symbols:
+            # c++filt splits command line arguments
+            parts = symbol.split(" ")
+            length = sum(len(i.encode("utf-8")) + 1 for i in parts)
+            if batch and size + length > Demangler.arg_limit:
+                yield batch
+                batch, size = [], 0
+            batch.append((symbol, parts))
+            size += length
+        if batch:
+            yield batch
+
+    def demangle(self, symbols):
+        """
+        Demangle symbols, running c++filt in as few calls as possible for those not cached yet.
+        Args:
+            symbols: The mangled symbols.
+        Returns:
+            ret: The mangled/demangled mapping.
+        """
+        cache = self.load_cache()
+        missing = list(dict.fromkeys(i for i in symbols if i not in cache))
+        if missing:
+            # one argument per token, the same as a separate call per symbol
+            for batch in self.batches(missing):
+                args = [j for _, parts in batch for j in parts]
+                pipe = subprocess.run(["c++filt", "-p"] + args, stdout=subprocess.PIPE)
+                demangled = iter(pipe.stdout.decode("utf-8").split("\n"))
+                for symbol, parts in batch:
+                    cache[symbol] = "\n".join(next(demangled) for _ in parts)
+                    Demangler.recent[symbol] = cache[symbol]
+        ret = dict()
+        for symbol in symbols:
+            ret[symbol] = cache[symbol]
+            cache.move_to_end(symbol)
+        # evict least recently used
+        while len(cache) > self.cache_size:
+            cache.popitem(last=False)
+        return ret
@@ -1,5 +1,6 @@
 import re
 
+from cache import DumpCache
 from calculate import Calculate
 from etl import ETL
 from log import Log
@@ -16,6 +17,31 @@ class Detect:
     def __init__(self, params):
         self.params = params
 
+    @staticmethod
+    def obtain_knowledge(param):
+        """
+        Obtain cpnt_order, func_block from a test_id or a dump_path.
+        Args:
+            param: A possible parameter (i.e., test_id, dump_path) that has crash failure.
+        Returns:
+            The cpnt_order and func_block for calculation.
+        """
+        # parameter is test_id
+        if re.match(r"^\d{9,}$", param):
+            dump, internal = ETL().extract_cdb(param), True
+        # parameter is dump_path, only the crash stack is decoded
+        else:
+            dump, internal = Process.read_stack(param), False
+        cache = DumpCache()
+        key = cache.key(dump, internal)
+        cached = cache.get_many([key])
+        if key in cached:
+            return cached[key]
+        processed = Process(dump).internal_process() if internal else Process(dump).pre_process()
+        cpnt_order, func_block = Knowledge(processed).add_knowledge()
+        cache.put_many({key: (cpnt_order, func_block)})
+        return cpnt_order, func_block
+
     def detect_sim(self):
         """
         Detect crash dump similarity and output the comparison result.
@@ -23,16 +49,7 @@ class Detect:
         message = []
         order_pair, block_pair = [], []
         for param in self.params:
-            # parameter is test_id
-            if re.match(r"^\d{9,}$", param):
-                dump = ETL().extract_cdb(param)
-                processed = Process(dump).internal_process()
-            # parameter is dump_path
-            else:
-                with open(param, "r", encoding="utf-8") as fp:
-                    dump = fp.read()
-                processed = Process(dump).pre_process()
-            cpnt_order, func_block = Knowledge(processed).add_knowledge()
+            cpnt_order, func_block = self.obtain_knowledge(param)
             message.extend([cpnt_order, func_block])
             order_pair.append(cpnt_order)
             block_pair.append(func_block)
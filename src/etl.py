@@ -1,13 +1,26 @@
+import calendar
 import configparser
 import hashlib
 import os
 import requests
 
+from cache import DumpCache
+from collections import deque
 from component import Component
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from itertools import islice
+from demangle import Demangler
+from inverted import InvertedIndex
 from knowledge import Knowledge
+from multiprocessing import Pool
 from pool import MongoConnection, SqlConnection
 from process import Process
+from pymongo import ReplaceOne
+from requests.adapters import HTTPAdapter
+from schema import Schema
+from sqlalchemy import bindparam, text
+from urllib3.util.retry import Retry
 
 
 class ETL:
@@ -25,19 +38,37 @@ class ETL:
     cdb_uri = config.get("sql", "cdb_uri")
     # ETL
     months = config.getint("etl", "months")
+    incremental = config.getboolean("etl", "incremental", fallback=True)
+    batch = config.getint("etl", "batch", fallback=500)
+    chunk = config.getint("etl", "chunk", fallback=1000)
+    threads = config.getint("etl", "threads", fallback=16)
+    retries = config.getint("etl", "retries", fallback=3)
+    backoff = config.getfloat("etl", "backoff", fallback=0.5)
+    timeout = config.getfloat("etl", "timeout", fallback=60.0)
+    session = None
 
-    def extract_qdb(self):
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count()
+        self.mark = 0
+        self.failed = []
+
+    def extract_qdb(self, since=None, retry=()):
         """
         Extract recent data from database.
+        Args:
+            since: Only extract data reviewed after this review comment if given.
+            retry: The test_ids extracted regardless of review comment, e.g., failed downloads.
         Returns:
-            test_id, start_time, dump_link, bug_id.
+            test_id, start_time, dump_link, bug_id, comment_id.
         """
         set_schema = """SET SCHEMA TESTER;"""
+        since_filter = "AND (TEST_VALID.ID > :since OR TEST_CASES.ID IN :retry)" if since is not None else ""
         extract_content = f"""
-        SELECT TEST_MANY.ID, TEST_MANY.START_TIME, TEST_MANY.LINK, TEST_MANY.BUG_ID
+        SELECT TEST_MANY.ID, TEST_MANY.START_TIME, TEST_MANY.LINK, TEST_MANY.BUG_ID, TEST_MANY.ID_COMMENT
         FROM
             (
-                SELECT TEST_CASES.ID, TEST_CASES.START_TIME, TEST_LOG_FILES.LINK, TEST_COMMENTS.BUG_ID
+                SELECT TEST_CASES.ID, TEST_CASES.START_TIME, TEST_LOG_FILES.LINK, TEST_COMMENTS.BUG_ID,
+                    TEST_VALID.ID AS ID_COMMENT
                 FROM TEST_CASES
                     JOIN TEST_LOG_FILES ON TEST_CASES.ID = TEST_LOG_FILES.ID_TEST_CASE
                     JOIN
@@ -57,6 +88,7 @@ class ETL:
                     AND TEST_COMMENTS.BUG_ID != 0
                     AND MAKES.BUILD_PURPOSE = 'G'
                     AND (MAKES.COMPONENT = 'HANA' OR MAKES.COMPONENT = 'Engine')
+                    {since_filter}
             ) AS TEST_MANY
             JOIN
             (
@@ -85,10 +117,15 @@ class ETL:
         WHERE TEST_ONLY.NUM = 1
         ORDER BY TEST_MANY.START_TIME DESC;
         """
+        statement = text(extract_content)
+        if since is not None:
+            statement = statement.bindparams(bindparam("retry", expanding=True))
         with SqlConnection(self.qdb_uri).connection as sql:
             sql.execute(set_schema)
-            result = sql.execute(extract_content).fetchall()
-        return result
+            # stream rows via server-side cursor, a test_id that never exists keeps the IN list non-empty
+            result = sql.execution_options(stream_results=True).execute(statement, since=since,
+                                                                        retry=list(retry) or [0])
+            yield from result
 
     def extract_cdb(self, test_id):
         """
@@ -96,22 +133,44 @@ class ETL:
         Returns:
             callstack_string.
         """
-        extract_content = f"""
-        SELECT HANAQA.CRASHES.CALLSTACK_STRING
+        return list(self.extract_cdbs([test_id]).values())[0]
+
+    def extract_cdbs(self, test_ids):
+        """
+        Extract history data from database via many test_ids in chunked queries.
+        Args:
+            test_ids: The test_ids to be extracted.
+        Returns:
+            ret: The test_id/callstack_string mapping.
+        """
+        extract_content = text("""
+        SELECT HANAQA.QADB_CRASHES.TEST_CASE_ID, HANAQA.CRASHES.CALLSTACK_STRING, 0 AS PRIORITY
         FROM HANAQA.QADB_CRASHES
             JOIN HANAQA.CRASHES
             ON HANAQA.QADB_CRASHES.CRASH_ID = HANAQA.CRASHES.CRASH_ID
-        WHERE HANAQA.QADB_CRASHES.TEST_CASE_ID = {test_id}
+        WHERE HANAQA.QADB_CRASHES.TEST_CASE_ID IN :qa_ids
         UNION ALL
-        SELECT BUGZILLA.CRASHES.CALLSTACK_STRING
+        SELECT HANAQA.QADB_CRASHES.TEST_CASE_ID, BUGZILLA.CRASHES.CALLSTACK_STRING, 1 AS PRIORITY
         FROM HANAQA.QADB_CRASHES
             JOIN BUGZILLA.CRASHES
             ON HANAQA.QADB_CRASHES.CRASH_ID = BUGZILLA.CRASHES.CRASH_ID
-        WHERE HANAQA.QADB_CRASHES.TEST_CASE_ID = {test_id};
-        """
+        WHERE HANAQA.QADB_CRASHES.TEST_CASE_ID IN :bz_ids
+        ORDER BY PRIORITY;
+        """).bindparams(bindparam("qa_ids", expanding=True), bindparam("bz_ids", expanding=True))
+        ret = dict()
+        test_ids = [int(i) for i in test_ids]
+        if not test_ids:
+            return ret
         with SqlConnection(self.cdb_uri).connection as sql:
-            result = sql.execute(extract_content).fetchall()
-        return result[0][0]
+            for i in range(0, len(test_ids), self.chunk):
+                chunk = test_ids[i:i+self.chunk]
+                # stream rows via server-side cursor
+                result = sql.execution_options(stream_results=True).execute(extract_content,
+                                                                            qa_ids=chunk, bz_ids=chunk)
+                for test_id, callstack, _ in result:
+                    # HANAQA first
+                    ret.setdefault(test_id, callstack)
+        return ret
 
     def extract_word(self):
         """
@@ -159,56 +218,314 @@ class ETL:
             result = sql.execute(extract_content).fetchall()
         return result
 
-    def transform(self):
+    def http_session(self):
+        """
+        Obtain the keep-alive session shared by all fetching threads.
+        Returns:
+            The shared session with retries and backoff.
+        """
+        if ETL.session is None:
+            retry = Retry(total=self.retries, backoff_factor=self.backoff, status_forcelist=[500, 502, 503, 504])
+            adapter = HTTPAdapter(pool_maxsize=self.threads, max_retries=retry)
+            session = requests.Session()
+            session.verify = False
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            ETL.session = session
+        return ETL.session
+
+    def fetch_dump(self, url):
+        """
+        Download a crash dump once.
+        Args:
+            url: The dump_link.
+        Returns:
+            The crash dump content, or None if the download failed.
+        """
+        try:
+            response = self.http_session().get(url, timeout=self.timeout)
+            if response.status_code == 200:
+                return response.content
+        except requests.RequestException:
+            pass
+        return None
+
+    def fetch_all(self, rows):
+        """
+        Fetch crash dumps concurrently with bounded prefetching, extracting history data of failed downloads in batch.
+        Args:
+            rows: The rows extracted from database.
+        Returns:
+            The rows, crash dumps and whether they are internal crash dumps, in original order.
+        """
+        rows = iter(rows)
+        with ThreadPoolExecutor(self.threads) as executor:
+            futures, held, failures = deque(), [], 0
+            while True:
+                # keep downloads in flight ahead of the consumer
+                for row in islice(rows, 4 * self.threads - len(futures)):
+                    futures.append((row, executor.submit(self.fetch_dump, row[2])))
+                if not futures:
+                    break
+                row, future = futures.popleft()
+                content = future.result()
+                # hold back rows behind a failed download to keep the original order
+                if content is None or held:
+                    held.append((row, content))
+                    failures += content is None
+                else:
+                    yield row, content, False
+                if held and (failures >= self.threads or len(held) >= 4 * self.threads or not futures):
+                    yield from self.fallback(held)
+                    held, failures = [], 0
+
+    def fallback(self, held):
+        """
+        Extract history data of failed downloads in batch.
+        Args:
+            held: The rows and crash dumps held back, None for failed downloads.
+        Returns:
+            The rows, crash dumps and whether they are internal crash dumps, in original order.
+        """
+        history = self.extract_cdbs([row[0] for row, content in held if content is None])
+        ret = []
+        for row, content in held:
+            if content is not None:
+                ret.append((row, content, False))
+            else:
+                ret.append((row, history.get(row[0]), True))
+        return ret
+
+    def window_start(self):
+        """
+        Obtain the start of crawling window, the same as ADD_MONTHS(TO_DATE(CURRENT_DATE), -months).
+        Returns:
+            The timestamp of crawling window start.
+        """
+        today = date.today()
+        year, month = divmod(today.year * 12 + today.month - 1 - self.months, 12)
+        day = min(today.day, calendar.monthrange(year, month + 1)[1])
+        return int(datetime(year, month + 1, day).timestamp())
+
+    def high_water(self, database):
+        """
+        Obtain the high-water mark of the last completed crawling for incremental crawling.
+        The mark is the latest review comment rather than start_time, since a test case is reviewed
+        (or reviewed again with another bug_id) after it ran.
+        Args:
+            database: The kdetector database.
+        Returns:
+            The latest review comment and the test_ids to be retried, or None without completed crawling.
+        """
+        meta = database["meta"].find_one({"_id": "etl"})
+        if not meta:
+            return None, []
+        return meta["mark"], meta["retry"]
+
+    def pending(self, rows, known):
+        """
+        Skip the rows already handled, keeping track of the latest review comment.
+        Args:
+            rows: The rows extracted from database.
+            known: The test_ids already handled.
+        Returns:
+            The rows to be handled.
+        """
+        for row in rows:
+            self.mark = max(self.mark, row[4])
+            if row[0] not in known:
+                yield row
+
+    def transform(self, since=None, retry=(), known=frozenset(), seen=frozenset()):
         """
         Convert original crash dump information into the target data format.
+        Args:
+            since: Only transform data reviewed after this review comment if given.
+            retry: The test_ids transformed regardless of review comment.
+            known: The test_ids already handled, which will be skipped.
+            seen: The md5sums already stored, which will be deduplicated.
         Returns:
-            Documents to be stored.
-        """
-        documents = []
-        hash_value = set()
-        result = self.extract_qdb()
-        count, total = 0, len(result)
-        for row in result:
-            count += 1
-            test_id, time_stamp, url, bug_id = row
-            print(f"{test_id}, {count}/{total}")
-            try:
-                if requests.get(url, verify=False).status_code == 200:
-                    dump = requests.get(url, verify=False).content.decode("utf-8")
-                    processed = Process(dump).pre_process()
+            Documents to be stored, generated one by one.
+        """
+        hash_value = set(seen)
+        self.mark = since or 0
+        result = self.pending(self.extract_qdb(since, retry), known)
+        fetched = self.fetch_all(result)
+        cache = DumpCache()
+        count = 0
+        computed = dict()
+        with Pool(self.workers, initializer=self.warm_worker) as pool:
+            tasks = deque()
+            while True:
+                # keep crash dumps in flight ahead of loading, so downloads and workers overlap
+                for row, dump, internal in islice(fetched, 4 * self.workers - len(tasks)):
+                    tasks.append((row, *self.submit(pool, cache, dump, internal)))
+                if not tasks:
+                    break
+                # in original order, so the deduplication does not depend on workers
+                row, key, task = tasks.popleft()
+                count += 1
+                print(f"{row[0]}, {count}")
+                # retry failed downloads next time
+                if task is None:
+                    self.failed.append(row[0])
+                    continue
+                if isinstance(task, tuple):
+                    cpnt_order, func_block = task
                 else:
-                    dump = self.extract_cdb(test_id)
-                    processed = Process(dump).internal_process()
-            except (IndexError, UnicodeDecodeError):
-                continue
+                    cpnt_order, func_block, recent = task.get()
+                    Demangler().merge_cache(recent)
+                    computed[key] = cpnt_order, func_block
+                    if len(computed) >= self.batch:
+                        cache.put_many(computed)
+                        computed = dict()
+                data = self.to_document(row, cpnt_order, func_block)
+                # deduplication via set
+                if not data or data["md5sum"] in hash_value:
+                    continue
+                hash_value.add(data["md5sum"])
+                yield data
+        cache.put_many(computed)
+
+    def submit(self, pool, cache, dump, internal):
+        """
+        Look up the knowledge of a crash dump in cache, or submit it to worker processes.
+        Args:
+            pool: The worker processes.
+            cache: The cache of processed crash dumps.
+            dump: The crash dump, or None if it could not be obtained.
+            internal: Whether it is an internal crash dump.
+        Returns:
+            The cache key, and the cached cpnt_order, func_block or the pending result (None without crash dump).
+        """
+        if dump is None:
+            return None, None
+        # only the crash stack is decoded and sent to workers
+        text = dump if internal else Process.stack_slice(dump)
+        key = cache.key(text, internal)
+        cached = cache.get_many([key])
+        if key in cached:
+            return key, cached[key]
+        return key, pool.apply_async(self.extract_knowledge, (text, internal))
+
+    @staticmethod
+    def to_document(row, cpnt_order, func_block):
+        """
+        Convert a row and its knowledge into the document to be stored.
+        Args:
+            row: test_id, start_time, dump_link, bug_id, comment_id.
+            cpnt_order: The component order information.
+            func_block: The function block information.
+        Returns:
+            data: The document to be stored, or None without knowledge.
+        """
+        test_id, time_stamp, url, bug_id, _ = row
+        if not cpnt_order or not func_block:
+            return None
+        data = dict()
+        data["test_id"] = test_id
+        data["time_stamp"] = int(datetime.timestamp(time_stamp))
+        data["cpnt_order"] = cpnt_order
+        data["func_block"] = func_block
+        data["bug_id"] = bug_id
+        data["md5sum"] = hashlib.md5("".join("".join(i) for i in func_block).encode("utf-8")).hexdigest()
+        return data
+
+    @staticmethod
+    def warm_worker():
+        """
+        Warm up the component and demangling caches once per worker process.
+        """
+        Component().load_mapping()
+        Component().load_location()
+        Demangler().load_cache()
+
+    @staticmethod
+    def extract_knowledge(dump, internal):
+        """
+        Process a crash dump and add component knowledge in worker process.
+        Args:
+            dump: The crash dump (or its crash stack).
+            internal: Whether it is an internal crash dump.
+        Returns:
+            The cpnt_order, func_block and the newly demangled mapping.
+        """
+        try:
+            if internal:
+                processed = Process(dump).internal_process()
+            else:
+                processed = Process(dump).pre_process()
             cpnt_order, func_block = Knowledge(processed).add_knowledge()
-            if not cpnt_order or not func_block:
-                continue
-            data = dict()
-            data["test_id"] = test_id
-            data["time_stamp"] = int(datetime.timestamp(time_stamp))
-            data["cpnt_order"] = cpnt_order
-            data["func_block"] = func_block
-            data["bug_id"] = bug_id
-            data["md5sum"] = hashlib.md5("".join("".join(i) for i in func_block).encode("utf-8")).hexdigest()
-            # deduplication via set
-            if data["md5sum"] in hash_value:
-                continue
-            hash_value.add(data["md5sum"])
-            documents.append(data)
-        return documents
+        except IndexError:
+            cpnt_order, func_block = [], []
+        return cpnt_order, func_block, Demangler().drain_recent()
+
+    def checkpoint(self, database):
+        """
+        Resume the interrupted ETL process in the same mode, or start a new one.
+        Args:
+            database: The kdetector database.
+        Returns:
+            since, retry, known, seen for transformation.
+        """
+        checkpoint = database["checkpoint"].find_one({"_id": "etl"})
+        if checkpoint and checkpoint["incremental"] == self.incremental and "retry" in checkpoint:
+            print(f"Resuming ETL process ({len(checkpoint['md5sum'])})...")
+            known = set(checkpoint["test_id"])
+            return checkpoint["since"], checkpoint["retry"], known, set(checkpoint["md5sum"])
+        if self.incremental:
+            since, retry = self.high_water(database)
+        else:
+            since, retry = None, []
+            database["dataset_build"].drop()
+        data = dict()
+        data["_id"] = "etl"
+        data["incremental"] = self.incremental
+        data["since"] = since
+        data["retry"] = retry
+        data["test_id"] = []
+        data["md5sum"] = []
+        database["checkpoint"].replace_one({"_id": "etl"}, data, upsert=True)
+        return since, retry, set(), set()
 
     def load(self):
         """
-        Load many documents into the database.
+        Load documents into the database in batches, checkpointing after each batch.
         """
         # knowledge updating
         Component().update_component()
         print("Start ETL process...")
-        documents = self.transform()
+        count = 0
         with MongoConnection(self.host, self.port) as mongo:
-            collection = mongo.connection["kdetector"]["dataset"]
-            collection.drop()
-            collection.insert_many(documents)
-        print(f"\x1b[32mSuccessfully executed ETL process ({len(documents)}).\x1b[0m")
+            database = mongo.connection["kdetector"]
+            # build aside and swap in full mode, so dataset is never empty
+            collection = database["dataset"] if self.incremental else database["dataset_build"]
+            since, retry, known, seen = self.checkpoint(database)
+            Schema().create_indexes(collection, "dataset")
+            documents = self.transform(since, retry, known, seen)
+            while True:
+                batch = list(islice(documents, self.batch))
+                if not batch:
+                    break
+                collection.bulk_write([ReplaceOne({"md5sum": data["md5sum"]}, data, upsert=True)
+                                       for data in batch], ordered=False)
+                database["checkpoint"].update_one({"_id": "etl"}, {"$push": {
+                    "test_id": {"$each": [data["test_id"] for data in batch]},
+                    "md5sum": {"$each": [data["md5sum"] for data in batch]}
+                }})
+                count += len(batch)
+            if self.incremental:
+                # expire documents outside the window
+                collection.delete_many({"time_stamp": {"$lt": self.window_start()}})
+            else:
+                Schema().swap(database, "dataset")
+            # the mark only moves on once crawling completed
+            data = dict()
+            data["_id"] = "etl"
+            data["mark"] = self.mark
+            data["retry"] = sorted(set(self.failed))
+            database["meta"].replace_one({"_id": "etl"}, data, upsert=True)
+            database["checkpoint"].delete_one({"_id": "etl"})
+        Demangler().save_cache()
+        print(f"\x1b[32mSuccessfully executed ETL process ({count}).\x1b[0m")
+        InvertedIndex().build_index()
@@ -1,13 +1,18 @@
 import configparser
+import hashlib
 import os
 import re
+import time
 
+from cache import DumpCache
 from clang.cindex import Config
 from clang.cindex import Index
-from collections import Counter
+from clang.cindex import TranslationUnit
 from component import Component
 from multiprocessing import Pool
 from pool import MongoConnection
+from schema import Schema
+from pymongo import DeleteOne, ReplaceOne, UpdateOne
 
 
 class Function:
@@ -20,6 +25,13 @@ class Function:
     # MongoDB
     host = config.get("mongodb", "host")
     port = config.getint("mongodb", "port")
+    # Function
+    batch = config.getint("function", "batch", fallback=1000)
+    fast = config.getboolean("function", "fast", fallback=True)
+    decl_kinds = {
+        "FUNCTION_DECL", "CXX_METHOD",
+        "CONSTRUCTOR", "DESTRUCTOR", "CONVERSION_FUNCTION"
+    }
 
     @staticmethod
     def header_path(dir_path):
@@ -44,6 +56,42 @@ class Function:
                     headers.append(curr_path)
         return headers
 
+    @staticmethod
+    def parse_arguments():
+        """
+        Obtain the arguments for parsing header file.
+        Returns:
+            The arguments for parsing header file.
+        """
+        # remove it when include dependencies resolved
+        git_root = "hana"
+        header = os.path.join(git_root, "rte", "rtebase", "include")
+        return ["-x", "c++", "-I" + git_root, "-I" + header]
+
+    def parse_options(self):
+        """
+        Obtain the options for parsing header file, skipping function bodies in fast mode.
+        Returns:
+            The options for parsing header file.
+        """
+        if self.fast:
+            return TranslationUnit.PARSE_SKIP_FUNCTION_BODIES | TranslationUnit.PARSE_INCOMPLETE
+        return 0
+
+    def header_digest(self, path):
+        """
+        Obtain the digest of header file content, parsing arguments and options.
+        Args:
+            path: The path of current header file.
+        Returns:
+            The hexadecimal digest.
+        """
+        sha1 = hashlib.sha1()
+        with open(path, "rb") as fp:
+            sha1.update(fp.read())
+        sha1.update("\0".join(self.parse_arguments() + [str(self.parse_options())]).encode("utf-8"))
+        return sha1.hexdigest()
+
     def fully_qualified(self, node, path):
         """
         Obtain fully qualified name recursively.
@@ -71,84 +119,263 @@ class Function:
         Returns:
             All fully qualified names in the header file.
         """
-        # remove it when include dependencies resolved
-        git_root = "hana"
-        header = os.path.join(git_root, "rte", "rtebase", "include")
-        arguments = ["-x", "c++", "-I" + git_root, "-I" + header]
         index = Index.create()
-        tu = index.parse(path, arguments)
+        tu = index.parse(path, self.parse_arguments(), options=self.parse_options())
         func_dict = dict()
-        decl_kinds = {
-            "FUNCTION_DECL", "CXX_METHOD",
-            "CONSTRUCTOR", "DESTRUCTOR", "CONVERSION_FUNCTION"
-        }
         cpnt = Component().best_matched(path)
+        functions = self.scoped_walk(tu, path) if self.fast else self.full_walk(tu, path)
+        for func in functions:
+            func_dict[func] = cpnt
+        return func_dict
+
+    def full_walk(self, tu, path):
+        """
+        Obtain fully qualified names by walking the entire abstract syntax tree.
+        Args:
+            tu: The translation unit of current header file.
+            path: The path of current header file.
+        Returns:
+            All fully qualified names in the header file.
+        """
+        functions = []
         for node in tu.cursor.walk_preorder():
             if node.location.file and node.location.file.name == path and node.spelling:
-                if str(node.kind).split(".")[1] in decl_kinds:
-                    func = self.fully_qualified(node, path)
-                    func_dict[func] = cpnt
-        return func_dict
+                if str(node.kind).split(".")[1] in self.decl_kinds:
+                    functions.append(self.fully_qualified(node, path))
+        return functions
+
+    def scoped_walk(self, tu, path):
+        """
+        Obtain fully qualified names by only descending into nodes of current header file,
+        building names on the way down with a namespace stack.
+        Args:
+            tu: The translation unit of current header file.
+            path: The path of current header file.
+        Returns:
+            All fully qualified names in the header file.
+        """
+        functions = []
+        stack = [(node, "") for node in tu.cursor.get_children()]
+        # DFS
+        while stack:
+            node, scope = stack.pop()
+            if node.location.file is None or node.location.file.name != path:
+                continue
+            semantic, lexical = node.semantic_parent, node.lexical_parent
+            # out-of-line definitions belong to their semantic parents
+            if semantic is not None and lexical is not None and semantic != lexical:
+                name = self.fully_qualified(node, path)
+            elif scope != "":
+                name = scope + "::" + node.spelling
+            else:
+                name = node.spelling
+            if node.spelling and str(node.kind).split(".")[1] in self.decl_kinds:
+                functions.append(name)
+            stack.extend((child, name) for child in node.get_children())
+        return functions
 
-    def multi_process(self, paths):
+    def parse_header(self, path):
         """
-        Use multi-process to parse functions in the header file.
+        Obtain all fully qualified names from current header file along with its path.
         Args:
-            paths: All header files' paths in code base.
+            path: The path of current header file.
         Returns:
-            The function parsing result from code base.
+            The path and all fully qualified names in the header file.
+        """
+        return path, self.find_function(path)
+
+    @staticmethod
+    def normalize(func_dict):
+        """
+        Normalize fully qualified names obtained from a header file.
+        Args:
+            func_dict: The Function-Component mapping of a header file.
+        Returns:
+            The normalized Function-Component mapping.
         """
-        # using multi-process
-        pool = Pool(os.cpu_count())
-        functions = pool.imap(self.find_function, paths)
-        pool.close(), pool.join()
         ret = dict()
-        for func_dict in [i for i in functions if i]:
-            for func in func_dict:
-                k = func
-                # handle anonymous namespace
-                while "::::" in k:
-                    k = k.replace("::::", "::")
-                # remove special characters
-                if re.search(r"[^\w:~]", k):
-                    idx = re.search(r"[^\w:~]", k).span()[0]
-                    k = k[:idx]
-                ret[k] = func_dict[func]
+        for func in func_dict:
+            k = func
+            # handle anonymous namespace
+            while "::::" in k:
+                k = k.replace("::::", "::")
+            # remove special characters
+            if re.search(r"[^\w:~]", k):
+                idx = re.search(r"[^\w:~]", k).span()[0]
+                k = k[:idx]
+            ret[k] = func_dict[func]
         return ret
 
     def update_function(self):
         """
-        Obtain File-Function mapping through Python bindings for Clang and load into database.
+        Obtain File-Function mapping through Python bindings for Clang and load into database,
+        re-parsing only the header files whose content changed.
         """
         # load libclang.so
         if not Config.loaded:
             Config.set_library_path("/usr/local/lib")
         git_root = "hana"
-        function_map = dict()
+        headers = []
         for node in os.listdir(git_root):
             curr_path = os.path.join(git_root, node)
             if os.path.isdir(curr_path):
-                print(curr_path)
-                # update functions by directory
-                headers = self.header_path(curr_path)
-                if headers:
-                    function_map.update(self.multi_process(headers))
-        # insert documents
-        documents = []
-        for key in sorted(function_map.keys()):
-            data = dict()
-            data["function"] = key
-            data["component"] = function_map[key]
-            documents.append(data)
+                headers.extend(self.header_path(curr_path))
+        digests = {path: self.header_digest(path) for path in headers}
         with MongoConnection(self.host, self.port) as mongo:
-            collection = mongo.connection["kdetector"]["function"]
-            collection.drop()
+            database = mongo.connection["kdetector"]
+            cached = {data["path"]: data for data in database["header"].find({}, {"_id": 0})}
+            # rebuild aside from scratch without header cache, swapped in once complete
+            suffix = "" if cached else "_build"
+            collection, cache = database["function" + suffix], database["header" + suffix]
+            if not cached:
+                collection.drop()
+                cache.drop()
+            schema = Schema()
+            schema.create_indexes(collection, "function")
+            schema.create_indexes(cache, "header")
+            changed = {i for i in headers if i not in cached or cached[i]["digest"] != digests[i]}
+            deleted = [i for i in cached if i not in digests]
+            print(f"{len(changed)} changed, {len(deleted)} deleted of {len(headers)} headers.")
+            requests, cache_requests, removed = [], [], []
+            remapped = 0
+            # remap unchanged headers whose component changed
+            for path in headers:
+                if path in cached and path not in changed:
+                    cpnt = Component().best_matched(path)
+                    if cpnt != cached[path]["component"]:
+                        requests.extend(UpdateOne({"function": func, "header": path}, {"$set": {"component": cpnt}})
+                                        for func in cached[path]["functions"])
+                        cache_requests.append(UpdateOne({"path": path}, {"$set": {"component": cpnt}}))
+                        remapped += 1
+            # schedule costly headers first
+            changed = sorted(changed, key=os.path.getsize, reverse=True)
+            chunk_size = max(1, len(changed) // (os.cpu_count() * 64))
+            start = time.time()
+            # one pool across the whole code base
+            with Pool(os.cpu_count()) as pool:
+                for count, (path, func_dict) in enumerate(pool.imap_unordered(self.parse_header, changed, chunk_size), 1):
+                    functions = sorted(self.normalize(func_dict))
+                    cpnt = Component().best_matched(path)
+                    requests.extend(self.claim(func, cpnt, path) for func in functions)
+                    if path in cached:
+                        removed.extend((func, path) for func in set(cached[path]["functions"]) - set(functions))
+                    data = dict()
+                    data["path"] = path
+                    data["digest"] = digests[path]
+                    data["functions"] = functions
+                    data["component"] = cpnt
+                    cache_requests.append(ReplaceOne({"path": path}, data, upsert=True))
+                    # stream into database in batches, functions before header cache
+                    if len(requests) >= self.batch:
+                        collection.bulk_write(requests, ordered=False)
+                        cache.bulk_write(cache_requests, ordered=False)
+                        requests, cache_requests = [], []
+                    elapsed = time.time() - start
+                    print(f"\r{count}/{len(changed)} headers, {count / elapsed:.1f} headers/s", end="")
+            for path in deleted:
+                removed.extend((func, path) for func in cached[path]["functions"])
+                cache_requests.append(DeleteOne({"path": path}))
+            if requests:
+                collection.bulk_write(requests, ordered=False)
+            if cache_requests:
+                cache.bulk_write(cache_requests, ordered=False)
+            self.remove_function(database, removed)
+            # functions before header cache, so an interruption leads to another rebuild
+            if not cached:
+                schema.swap(database, "function")
+                schema.swap(database, "header")
+            total = database["function"].estimated_document_count()
+            # invalidate cached crash dumps on knowledge change
+            if changed or deleted or remapped:
+                DumpCache.bump_version(database)
+            prefixes = self.build_prefix(database)
+        print(f"\n\x1b[32mSuccessfully updated File-Function mapping ({total}).\x1b[0m")
+        print(f"\x1b[32mSuccessfully built function prefixes ({prefixes}).\x1b[0m")
+
+    @staticmethod
+    def claim(func, cpnt, path):
+        """
+        Obtain the upsert of a function declared by a header file. When several header files declare
+        the same function, the lowest header path owns it regardless of parsing order and history.
+        Args:
+            func: A normalized fully qualified name.
+            cpnt: The component of the header file.
+            path: The path of the header file.
+        Returns:
+            The update operation.
+        """
+        # evaluated against the stored document, so the owner is compared before being replaced
+        owned = {"$lte": [path, {"$ifNull": ["$header", path]}]}
+        return UpdateOne({"function": func}, [{"$set": {
+            "component": {"$cond": [owned, cpnt, "$component"]},
+            "header": {"$cond": [owned, path, "$header"]}
+        }}], upsert=True)
+
+    @staticmethod
+    def remove_function(database, removed):
+        """
+        Hand functions no longer declared by their header over to another header, or remove them.
+        Args:
+            database: The kdetector database.
+            removed: The functions and the headers which no longer declare them.
+        """
+        collection, cache = database["function"], database["header"]
+        for func, path in removed:
+            data = collection.find_one({"function": func, "header": path})
+            if not data:
+                continue
+            # the same rule as claim, the lowest header path wins
+            owner = cache.find_one({"functions": func}, sort=[("path", 1)])
+            if owner:
+                collection.update_one({"function": func}, {"$set": {"component": owner["component"],
+                                                                     "header": owner["path"]}})
+            else:
+                collection.delete_one({"function": func})
+
+    def build_prefix(self, database):
+        """
+        Build the component histogram of every namespace prefix from function collection and load into database.
+        Args:
+            database: The kdetector database.
+        Returns:
+            The number of prefixes.
+        """
+        counts, first = dict(), dict()
+        for data in database["function"].find({}, {"_id": 0, "function": 1, "component": 1}):
+            function, cpnt = data["function"], data["component"]
+            prefix = function
+            # the function itself and each enclosing scope
+            while True:
+                key = (prefix, cpnt)
+                counts[key] = counts.get(key, 0) + 1
+                if key not in first or function < first[key]:
+                    first[key] = function
+                if "::" not in prefix:
+                    break
+                prefix = prefix[:prefix.rindex("::")]
+        histograms = dict()
+        for (prefix, cpnt), count in counts.items():
+            histograms.setdefault(prefix, []).append({"component": cpnt, "count": count, "first": first[(prefix, cpnt)]})
+        collection = database["prefix_build"]
+        collection.drop()
+        documents = []
+        for prefix in sorted(histograms.keys()):
+            entry = dict()
+            entry["prefix"] = prefix
+            # most common first, then in function order
+            entry["components"] = sorted(histograms[prefix], key=lambda x: (-x["count"], x["first"]))
+            documents.append(entry)
+            if len(documents) >= self.batch:
+                collection.insert_many(documents)
+                documents = []
+        if documents:
             collection.insert_many(documents)
-        print(f"\x1b[32mSuccessfully updated File-Function mapping ({len(documents)}).\x1b[0m")
+        Schema().swap(database, "prefix")
+        return len(histograms)
 
     def best_matched(self, function):
         """
-        Query the function collection to obtain the best matched component.
+        Query the function and prefix collections to obtain the best matched component.
         Args:
             function: A demangled function is the stack frame.
         Returns:
@@ -156,22 +383,25 @@ class Function:
         """
         matched = "UNKNOWN"
         with MongoConnection(self.host, self.port) as mongo:
-            collection = mongo.connection["kdetector"]["function"]
-            data = collection.find_one({"function": function})
+            database = mongo.connection["kdetector"]
+            data = database["function"].find_one({"function": function})
             if not data:
-                components = []
+                prefixes = []
                 while "::" in function:
                     function = function[:function.rindex("::")]
-                    candidates = collection.find({"function": {"$regex": "^%s(:{2}|$)" % function}})
-                    for cand in candidates:
-                        components.append(cand["component"])
-                    if components:
+                    prefixes.append(function)
+                histograms = dict()
+                for entry in database["prefix"].find({"prefix": {"$in": prefixes}}):
+                    histograms[entry["prefix"]] = entry["components"]
+                # the longest prefix wins
+                for prefix in prefixes:
+                    if prefix in histograms:
+                        stats = histograms[prefix]
                         # handle equal numbers
-                        stats = Counter(components).most_common()
-                        if len(stats) > 1 and stats[1][1] == stats[0][1]:
-                            matched = stats[1][0]
+                        if len(stats) > 1 and stats[1]["count"] == stats[0]["count"]:
+                            matched = stats[1]["component"]
                         else:
-                            matched = stats[0][0]
+                            matched = stats[0]["component"]
                         break
             else:
                 matched = data["component"]
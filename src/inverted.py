@@ -0,0 +1,97 @@
+import configparser
+import os
+
+from calculate import Calculate
+from collections import defaultdict
+from pool import MongoConnection
+from schema import Schema
+
+
+class InvertedIndex:
+    """
+    Inverted index from component name to the crash dumps containing it, used for candidate pruning.
+    """
+    config = configparser.ConfigParser()
+    config_path = os.path.join(os.getcwd(), "config.ini")
+    config.read(config_path)
+    # MongoDB
+    host = config.get("mongodb", "host")
+    port = config.getint("mongodb", "port")
+
+    @staticmethod
+    def component_position(cpnt_order):
+        """
+        Obtain the positions of each component within a component sequence.
+        Args:
+            cpnt_order: A component sequence.
+        Returns:
+            The component/positions mapping.
+        """
+        positions = defaultdict(list)
+        for pos, cpnt in enumerate(cpnt_order):
+            positions[cpnt].append(pos)
+        return positions
+
+    def build_index(self):
+        """
+        Build postings lists from cpnt_order in dataset and load into database.
+        """
+        postings = defaultdict(list)
+        with MongoConnection(self.host, self.port) as mongo:
+            dataset = mongo.connection["kdetector"]["dataset"]
+            for data in dataset.find({}, {"_id": 0, "test_id": 1, "cpnt_order": 1}):
+                length = len(data["cpnt_order"])
+                for cpnt, positions in self.component_position(data["cpnt_order"]).items():
+                    postings[cpnt].append([data["test_id"], length, positions])
+            # insert documents
+            documents = []
+            for key in sorted(postings.keys()):
+                entry = dict()
+                entry["component"] = key
+                entry["postings"] = postings[key]
+                documents.append(entry)
+            database = mongo.connection["kdetector"]
+            database["inverted_build"].drop()
+            if documents:
+                database["inverted_build"].insert_many(documents)
+            if not Schema().swap(database, "inverted"):
+                database["inverted"].drop()
+        print(f"\x1b[32mSuccessfully built inverted index ({len(documents)}).\x1b[0m")
+
+    def is_built(self):
+        """
+        Check whether the inverted index is available in database.
+        Returns:
+            Whether the inverted index is available.
+        """
+        with MongoConnection(self.host, self.port) as mongo:
+            collection = mongo.connection["kdetector"]["inverted"]
+            return collection.find_one({}, {"_id": 1}) is not None
+
+    def shortlist(self, cpnt_order):
+        """
+        Obtain crash dumps sharing components with the query, ordered by similarity upper bound.
+        Args:
+            cpnt_order: The component sequence of the query.
+        Returns:
+            The candidates composed of upper bound and test_id in descending order.
+        """
+        query = self.component_position(cpnt_order)
+        lengths = dict()
+        shared = defaultdict(list)
+        with MongoConnection(self.host, self.port) as mongo:
+            collection = mongo.connection["kdetector"]["inverted"]
+            for entry in collection.find({"component": {"$in": list(query.keys())}}):
+                for test_id, length, positions in entry["postings"]:
+                    lengths[test_id] = length
+                    shared[test_id].append((query[entry["component"]], positions))
+        candidates = []
+        for test_id, pairs in shared.items():
+            position_pair = [[], []]
+            for src, tgt in pairs:
+                position_pair[0].extend(src)
+                position_pair[1].extend(tgt)
+            max_len = max(len(cpnt_order), lengths[test_id])
+            candidates.append((Calculate.upper_bound(position_pair, max_len), test_id))
+        candidates.sort(key=lambda x: x[0], reverse=True)
+        return candidates
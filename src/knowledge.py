@@ -1,9 +1,9 @@
 import configparser
 import os
 import re
-import subprocess
 
 from component import Component
+from demangle import Demangler
 
 
 class Knowledge:
@@ -44,19 +44,6 @@ class Knowledge:
             return []
         return [i for i in function.split("::") if i]
 
-    @staticmethod
-    def execute_shell(command):
-        """
-        Execute a specified shell command.
-        Args:
-            command: The input command.
-        Returns:
-            The output after command execution.
-        """
-        pipe = subprocess.Popen(command, stdout=subprocess.PIPE, stdin=subprocess.PIPE)
-        stdout, _ = pipe.communicate()
-        return stdout.decode("utf-8")[:-1]
-
     def to_component(self, path):
         """
         Convert the absolute path to possible component name.
@@ -67,11 +54,11 @@ class Knowledge:
         """
         git_root = "hana"
         if "/" not in path:
-            cmd = f"find {git_root} -name {path}"
-            full_path = self.execute_shell(cmd.split(" "))
+            paths = Component().locate(path)
+            full_path = paths[0] if len(paths) == 1 else ""
         else:
             full_path = f"{git_root}/{path}"
-        if not full_path or "\n" in full_path:
+        if not full_path:
             component = "UNKNOWN"
         else:
             component = Component().best_matched(full_path)
@@ -84,17 +71,19 @@ class Knowledge:
             The cpnt_order and func_block for calculation.
         """
         cpnt_order, func_block = [], []
+        frames = []
         for frame in self.processed:
             function, path = frame
             # filter stop words
             base_name = path[path.rindex("/") + 1:] if "/" in path else path
             if base_name in self.stop_words:
                 continue
-            # demangling
-            if function.startswith("_Z"):
-                cmd = f"c++filt -p {function}"
-                function = self.execute_shell(cmd.split(" "))
-            function = self.unboxing(function)
+            frames.append(frame)
+        # demangling in batch
+        demangled = Demangler().demangle([i[0] for i in frames if i[0].startswith("_Z")])
+        for frame in frames:
+            function, path = frame
+            function = self.unboxing(demangled.get(function, function))
             if not function:
                 continue
             # component = function[0]
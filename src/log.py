@@ -62,6 +62,20 @@ class Log:
             print("Similarity = 0.00%")
         print("\n", end="")
 
+    @staticmethod
+    def search_print(matches):
+        """
+        Print the best matched crash dumps in ranking way.
+        Args:
+            matches: The matches composed of similarity, test_id and bug_id.
+        """
+        print("\n", end="")
+        print(f"\x1b[0;36m{'Rank':<6}{'Test ID':<16}{'Bug ID':<12}Similarity\x1b[0m")
+        for rank, match in enumerate(matches, 1):
+            sim, test_id, bug_id = match
+            print(f"{rank:<6}{test_id:<16}{bug_id:<12}{sim:.2%}")
+        print("\n", end="")
+
     def chart_print(self, message):
         """
         Output stop words statistics via bar chart.
@@ -6,14 +6,35 @@ import urllib3
 
 from detect import Detect
 from etl import ETL
+from schema import Schema
+from search import Search
 from stop_word import StopWord
 from train import Train
 
+
+def positive_int(value):
+    """
+    Convert a command line argument to a positive integer.
+    Args:
+        value: The command line argument.
+    Returns:
+        The positive integer.
+    """
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"{value} is not a positive integer")
+    return number
+
+
 parser = argparse.ArgumentParser()
 parser.add_argument("--crawl", nargs="?", const=True, help="Crawling recent crash dumps.")
+parser.add_argument("--workers", type=positive_int, help="Number of worker processes for crawling.")
 parser.add_argument("--train", nargs="?", const=True, help="Training for parameter tuning.")
 parser.add_argument("--stop", nargs="?", const=True, help="Count file names that can be filtered.")
 parser.add_argument("--detect", nargs=2, help="Detect crash dump similarity.")
+parser.add_argument("--search", help="Search similar crash dumps in dataset.")
+parser.add_argument("--top-k", type=positive_int, default=10, help="Number of similar crash dumps to be searched.")
+parser.add_argument("--check", nargs="?", const=True, help="Check indexes and slow queries of database.")
 args = parser.parse_args()
 # suppress warnings
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -21,7 +42,7 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 if __name__ == "__main__":
     # crawling recent crash dumps
     if args.crawl:
-        ETL().load()
+        ETL(args.workers).load()
     # training for parameter tuning
     if args.train:
         Train().training()
@@ -31,3 +52,9 @@ if __name__ == "__main__":
     # detect crash dump similarity
     if args.detect:
         Detect(args.detect).detect_sim()
+    # search similar crash dumps
+    if args.search:
+        Search(args.search, args.top_k).search_sim()
+    # check indexes and slow queries
+    if args.check:
+        Schema().check()
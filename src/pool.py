@@ -1,14 +1,106 @@
+import configparser
+import os
+import threading
+
+from collections import Counter
 from pymongo import MongoClient
 from sqlalchemy import create_engine
 
 
+class ConnectionPool:
+    """
+    Process-wide MongoClient and Engine instances, created lazily and keyed by URI.
+    Attributes:
+        clients: The MongoClient instances keyed by host and port.
+        engines: The Engine instances keyed by URI.
+        opened: The number of clients/engines opened by kind.
+        reused: The number of clients/engines reused by kind.
+    """
+    config = configparser.ConfigParser()
+    config_path = os.path.join(os.getcwd(), "config.ini")
+    config.read(config_path)
+    # Pool
+    mongo_size = config.getint("pool", "mongo_size", fallback=100)
+    sql_size = config.getint("pool", "sql_size", fallback=5)
+    timeout = config.getint("pool", "timeout", fallback=30)
+    clients = dict()
+    engines = dict()
+    opened = Counter()
+    reused = Counter()
+    lock = threading.Lock()
+
+    @classmethod
+    def mongo_client(cls, host, port):
+        """
+        Obtain the shared MongoClient instance.
+        Args:
+            host: A host name.
+            port: A port number.
+        Returns:
+            The shared MongoClient instance.
+        """
+        with cls.lock:
+            if (host, port) in cls.clients:
+                cls.reused["mongo"] += 1
+            else:
+                cls.clients[(host, port)] = MongoClient(host, port,
+                                                        maxPoolSize=cls.mongo_size,
+                                                        connectTimeoutMS=cls.timeout * 1000,
+                                                        serverSelectionTimeoutMS=cls.timeout * 1000)
+                cls.opened["mongo"] += 1
+            return cls.clients[(host, port)]
+
+    @classmethod
+    def sql_engine(cls, uri):
+        """
+        Obtain the shared Engine instance.
+        Args:
+            uri: A database URI.
+        Returns:
+            The shared Engine instance.
+        """
+        with cls.lock:
+            if uri in cls.engines:
+                cls.reused["sql"] += 1
+            else:
+                cls.engines[uri] = create_engine(uri,
+                                                 pool_size=cls.sql_size,
+                                                 pool_timeout=cls.timeout,
+                                                 pool_pre_ping=True)
+                cls.opened["sql"] += 1
+            return cls.engines[uri]
+
+    @classmethod
+    def stats(cls):
+        """
+        Obtain the counters of opened and reused connections.
+        Returns:
+            The opened/reused counters by kind.
+        """
+        return {"opened": dict(cls.opened), "reused": dict(cls.reused)}
+
+    @classmethod
+    def reset(cls):
+        """
+        Forget inherited clients and engines in a forked child, since their sockets belong to the parent.
+        """
+        cls.clients = dict()
+        cls.engines = dict()
+        cls.opened = Counter()
+        cls.reused = Counter()
+        cls.lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=ConnectionPool.reset)
+
+
 class MongoConnection:
     """
     The life cycle management of MongoDB connection via context manager.
     Attributes:
         host: A host name.
         port: A port number.
-        connection: Create a new MongoClient instance.
+        connection: The shared MongoClient instance.
     """
     def __init__(self, host, port):
         self.host = host
@@ -16,16 +108,17 @@ class MongoConnection:
         self.connection = None
 
     def __enter__(self):
-        self.connection = MongoClient(self.host, self.port)
+        self.connection = ConnectionPool.mongo_client(self.host, self.port)
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.connection.close()
+        # the shared client stays open for reuse
+        self.connection = None
 
 
 class SqlConnection:
     """
-    Create a new Engine instance.
+    Check out a connection from the shared Engine instance.
     """
     def __init__(self, uri):
-        self.connection = create_engine(uri).connect()
+        self.connection = ConnectionPool.sql_engine(uri).connect()
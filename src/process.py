@@ -1,3 +1,6 @@
+import io
+import mmap
+import os
 import re
 
 
@@ -5,28 +8,151 @@ class Process:
     """
     Data preprocessing for crash dump string.
     Attributes:
-        dump: A crash dump string.
+        dump: A crash dump, given as a string, bytes or an iterable of lines (e.g., a file object).
     """
+    # section markers
+    stack_start = "[CRASH_STACK]"
+    stack_end = "[CRASH_REGISTERS]"
+    source = "Source: "
+    # backtrace patterns
+    frame_pattern = re.compile(r"[ ]*\d+:[ ](.+)")
+    offset_pattern = re.compile(r"([ ]const)*[ ][+][ ]0x\w+")
+    internal_pattern = re.compile(r"^\d+:[ ](.+)[ ]at[ ](.+)", re.M)
+
     def __init__(self, dump):
         self.dump = dump
 
+    @staticmethod
+    def stack_slice(buffer):
+        """
+        Decode only the crash stack part of a raw crash dump, replacing invalid bytes.
+        Args:
+            buffer: The raw crash dump as a bytes-like object (e.g., bytes, mmap).
+        Returns:
+            The crash stack string up to and including the end marker, or an empty string if not found.
+        """
+        start_marker = Process.stack_start.encode("utf-8")
+        end_marker = Process.stack_end.encode("utf-8")
+        if buffer[:len(start_marker)] == start_marker:
+            start = 0
+        else:
+            start = buffer.find(b"\n" + start_marker) + 1
+            if start == 0:
+                return ""
+        # the end marker is looked for from the next line on
+        line_end = buffer.find(b"\n", start)
+        end = buffer.find(end_marker, line_end) if line_end >= 0 else -1
+        stop = end + len(end_marker) if end >= 0 else len(buffer)
+        return bytes(buffer[start:stop]).decode("utf-8", errors="replace")
+
+    @staticmethod
+    def read_stack(path):
+        """
+        Read the crash stack part of a local crash dump through a memory map.
+        Args:
+            path: The path of crash dump.
+        Returns:
+            The crash stack string, or an empty string if not found.
+        """
+        with open(path, "rb") as fp:
+            # empty file cannot be mapped
+            if os.fstat(fp.fileno()).st_size == 0:
+                return ""
+            with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                return Process.stack_slice(buffer)
+
+    def lines(self):
+        """
+        Obtain the lines of crash dump one by one without the line break.
+        Returns:
+            The lines of crash dump.
+        """
+        dump = self.dump
+        if isinstance(dump, bytes):
+            dump = io.BytesIO(dump)
+        elif isinstance(dump, str):
+            dump = io.StringIO(dump)
+        for line in dump:
+            if isinstance(line, bytes):
+                line = line.decode("utf-8")
+            yield line[:-1] if line.endswith("\n") else line
+
+    def inline_source(self, frame):
+        """
+        Look for the source within the frame line itself, which is used if no source follows before the next dash.
+        Args:
+            frame: The frame line after the frame number.
+        Returns:
+            The function before the last source followed by a path and the path, or None if not found.
+        """
+        pos = frame.rfind(self.source)
+        while pos >= 0:
+            # the function is not empty and a non-dash character precedes the source
+            if pos >= 2 and frame[pos - 1] != "-":
+                rest = frame[pos + len(self.source):]
+                colon = rest.rfind(":")
+                if colon > 0:
+                    return frame[:pos - 1], rest[:colon]
+            pos = frame.rfind(self.source, 0, pos)
+        return None
+
     def pre_process(self):
         """
-        Extract the backtrace part of the original crash dump string.
+        Extract the backtrace part of the original crash dump in a single pass,
+        which stops reading at the end of crash stack.
         Returns:
             processed: Processed string with function, path information.
         """
-        stack_pattern = re.compile(r"\n(\[CRASH_STACK][\s\S]+)\[CRASH_REGISTERS]", re.M)
-        stack = stack_pattern.findall(self.dump)[0]
-        # backtrace pattern
-        pattern = re.compile(r"-\n[ ]*\d+:[ ](.+)[^-]+Source:[ ](.+):", re.M)
-        frames = pattern.findall(stack)
-        for frame in frames:
-            function, path = frame
-            # remove offset
-            offset_pattern = re.compile(r"([ ]const)*[ ][+][ ]0x\w+")
-            function = re.sub(offset_pattern, "", function)
-            yield [function, path]
+        frames = []
+        lines = self.lines()
+        # skip to crash stack
+        for line in lines:
+            if line.startswith(self.stack_start):
+                ended = line.endswith("-")
+                break
+        else:
+            raise IndexError("crash stack not found")
+        function, path, inline = None, None, None
+        for line in lines:
+            end = line.find(self.stack_end)
+            if end >= 0:
+                line = line[:end]
+            emitted = False
+            # look for source of current frame until the next dash
+            if function is not None:
+                dash = line.find("-")
+                pos = line.rfind(self.source, 0, len(line) if dash < 0 else dash)
+                # the last source followed by a path
+                while pos >= 0:
+                    rest = line[pos + len(self.source):]
+                    colon = rest.rfind(":")
+                    if colon > 0:
+                        path = rest[:colon]
+                        break
+                    pos = line.rfind(self.source, 0, pos)
+                if dash >= 0 or end >= 0:
+                    if path is not None:
+                        # remove offset
+                        frames.append([self.offset_pattern.sub("", function), path])
+                        emitted = True
+                    elif inline is not None:
+                        frames.append([self.offset_pattern.sub("", inline[0]), inline[1]])
+                        emitted = True
+                    function, path, inline = None, None, None
+            # a frame follows a dashed line
+            if function is None and not emitted and ended:
+                matched = self.frame_pattern.match(line)
+                if matched:
+                    function, path, inline = matched.group(1), None, self.inline_source(matched.group(1))
+                    # the stack ends within the frame line
+                    if end >= 0 and inline is not None:
+                        frames.append([self.offset_pattern.sub("", inline[0]), inline[1]])
+            if end >= 0:
+                break
+            ended = line.endswith("-")
+        else:
+            raise IndexError("crash registers not found")
+        yield from frames
 
     def internal_process(self):
         """
@@ -35,8 +161,7 @@ class Process:
             processed: Processed string with function, path information.
         """
         backtrace = self.dump[:self.dump.find("\n\n")]
-        pattern = re.compile(r"^\d+:[ ](.+)[ ]at[ ](.+)", re.M)
-        frames = pattern.findall(backtrace)
+        frames = self.internal_pattern.findall(backtrace)
         for frame in frames:
             function, path = frame
             yield [function, path]
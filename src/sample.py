@@ -1,17 +1,23 @@
 import bugzilla
 import configparser
+import math
 import os
 
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from pool import MongoConnection
-from itertools import combinations
-from random import sample
+from pymongo import ReplaceOne
+from random import Random
+from schema import Schema
 from utils import UF
 
 
 class Sample:
     """
     Sample negatives and positives via bug_id.
+    Attributes:
+        bzapi: The Bugzilla client, which can be replaced by a local fake one.
     """
     config = configparser.ConfigParser()
     config_path = os.path.join(os.getcwd(), "config.ini")
@@ -22,6 +28,14 @@ class Sample:
     # Bugzilla
     url = config.get("bugzilla", "url")
     key = config.get("bugzilla", "key")
+    chunk = config.getint("bugzilla", "chunk", fallback=200)
+    threads = config.getint("bugzilla", "threads", fallback=8)
+    # Sample
+    size = config.getint("sample", "size", fallback=None)
+    seed = config.getint("sample", "seed", fallback=None)
+
+    def __init__(self, bzapi=None):
+        self.bzapi = bzapi
 
     def bug_map(self):
         """
@@ -29,16 +43,62 @@ class Sample:
         Returns:
             bug_map: The bug_id/test_id mapping.
         """
-        bug_map = defaultdict(list)
+        bug_map = dict()
         # obtain bug_id/test_id mapping
         with MongoConnection(self.host, self.port) as mongo:
             collection = mongo.connection["kdetector"]["dataset"]
-            dataset = collection.find()
-        for data in dataset:
-            bug_id, test_id = data["bug_id"], data["test_id"]
-            bug_map[bug_id].append(test_id)
+            pipeline = [
+                {"$sort": {"test_id": 1}},
+                {"$group": {"_id": "$bug_id", "test_ids": {"$push": "$test_id"}}},
+                {"$sort": {"_id": 1}}
+            ]
+            for data in collection.aggregate(pipeline, allowDiskUse=True):
+                bug_map[data["_id"]] = data["test_ids"]
         return bug_map
 
+    def fetch_dupe(self, bug_list):
+        """
+        Query Bugzilla for duplicate relations in chunks concurrently.
+        Args:
+            bug_list: The bug_ids to be queried.
+        Returns:
+            dupe_map: The bug_id/dupe_of mapping.
+        """
+        if not bug_list:
+            return dict()
+        if self.bzapi is None:
+            self.bzapi = bugzilla.Bugzilla(self.url, api_key=self.key, sslverify=False)
+        chunks = [bug_list[i:i+self.chunk] for i in range(0, len(bug_list), self.chunk)]
+        dupe_map = dict()
+        with ThreadPoolExecutor(self.threads) as executor:
+            for bugs in executor.map(lambda x: self.bzapi.getbugs(x, include_fields=["id", "dupe_of"]), chunks):
+                for bug in bugs:
+                    if bug:
+                        dupe_map[bug.id] = getattr(bug, "dupe_of", None)
+        return dupe_map
+
+    def dupe_map(self, bug_list):
+        """
+        Obtain duplicate relations, only asking Bugzilla for those not cached.
+        Args:
+            bug_list: The key list of bug_map.
+        Returns:
+            dupe_map: The bug_id/dupe_of mapping.
+        """
+        with MongoConnection(self.host, self.port) as mongo:
+            collection = mongo.connection["kdetector"]["bug"]
+            # expire cached relations
+            Schema().create_indexes(collection, "bug")
+            cursor = collection.find({"bug_id": {"$in": bug_list}}, {"_id": 0, "bug_id": 1, "dupe_of": 1})
+            dupe_map = {data["bug_id"]: data["dupe_of"] for data in cursor}
+            fetched = self.fetch_dupe([i for i in bug_list if i not in dupe_map])
+            if fetched:
+                now = datetime.utcnow()
+                collection.bulk_write([ReplaceOne({"bug_id": k}, {"bug_id": k, "dupe_of": v, "updated": now}, upsert=True)
+                                       for k, v in fetched.items()], ordered=False)
+        dupe_map.update(fetched)
+        return dupe_map
+
     def union_map(self, bug_list):
         """
         Obtain the mapping relationship between bug_id and group_id.
@@ -47,17 +107,14 @@ class Sample:
         Returns:
             union_map: The bug_id/group_id mapping.
         """
-        pairs = []
-        bzapi = bugzilla.Bugzilla(self.url, api_key=self.key, sslverify=False)
+        dupe_map = self.dupe_map(bug_list)
+        index = {bug_id: i for i, bug_id in enumerate(bug_list)}
         # obtain bug_id/group_id mapping
-        for bug_id in bug_list:
-            bug = bzapi.getbug(bug_id)
-            if bug.dupe_of and bug.dupe_of in bug_list:
-                pairs.append([bug_id, bug.dupe_of])
         uf = UF(len(bug_list))
-        for pair in pairs:
-            uf.union(bug_list.index(pair[0]), bug_list.index(pair[1]))
-        union_map = dict(zip(bug_list, uf.id))
+        for bug_id in bug_list:
+            if dupe_map.get(bug_id) in index:
+                uf.union(index[bug_id], index[dupe_map[bug_id]])
+        union_map = {bug_id: uf.find(index[bug_id]) for bug_id in bug_list}
         return union_map
 
     def group_data(self):
@@ -66,32 +123,62 @@ class Sample:
         Returns:
             groups: The result of test_id grouping.
         """
-        groups = []
         bug_map = self.bug_map()
         union_map = self.union_map(list(bug_map.keys()))
-        # test_id grouping
-        for union_id in set(union_map.values()):
-            group = []
-            for k, v in union_map.items():
-                if v == union_id:
-                    group.extend(bug_map[k])
-            if len(group) > 1:
-                groups.append(group)
+        # test_id grouping in one pass
+        grouped = defaultdict(list)
+        for bug_id, test_ids in bug_map.items():
+            grouped[union_map[bug_id]].extend(test_ids)
+        groups = [group for group in grouped.values() if len(group) > 1]
         return groups
 
-    def sample_data(self):
+    @staticmethod
+    def unrank_pair(rank, size):
+        """
+        Obtain the pair at the given rank of combinations(range(size), 2) without enumerating them.
+        Args:
+            rank: The rank of pair in lexicographic order.
+            size: The size of group.
+        Returns:
+            The pair of indexes.
+        """
+        total = size * (size - 1) // 2
+        # count of pairs after the row of the pair
+        i = size - 2 - (math.isqrt(8 * (total - rank - 1) + 1) - 1) // 2
+        j = rank - total + (size - i) * (size - i - 1) // 2 + i + 1
+        return i, j
+
+    def sample_data(self, size=size, seed=seed):
         """
-        Sample data based on combination and random methods.
+        Sample data based on stratified combination and random methods.
+        Args:
+            size: The target number of positives, all pairs if not given.
+            seed: The random seed for reproducible sampling.
         Returns:
             The negatives and positives after sampling.
         """
         print("Start data sampling...")
+        rng = Random(seed)
         positives, negatives = [], []
         groups = self.group_data()
-        for group in groups:
-            positives.extend(list(combinations(group, 2)))
+        counts = [len(group) * (len(group) - 1) // 2 for group in groups]
+        total = sum(counts)
+        # allocate quota proportionally by largest remainder
+        if size is None or size >= total:
+            quotas = counts
+        else:
+            shares = [size * count / total for count in counts]
+            quotas = [int(share) for share in shares]
+            ranks = sorted(range(len(groups)), key=lambda x: quotas[x] - shares[x])
+            for k in ranks[:size - sum(quotas)]:
+                quotas[k] += 1
+        for group, count, quota in zip(groups, counts, quotas):
+            ranks = range(count) if quota == count else sorted(rng.sample(range(count), quota))
+            for rank in ranks:
+                i, j = self.unrank_pair(rank, len(group))
+                positives.append((group[i], group[j]))
         for _ in range(len(positives)):
-            group1, group2 = sample(groups, 2)
-            negatives.append((sample(group1, 1)[0], sample(group2, 1)[0]))
+            group1, group2 = rng.sample(groups, 2)
+            negatives.append((rng.choice(group1), rng.choice(group2)))
         print(f"\x1b[32mSuccessfully completed data sampling ({len(positives)} x 2).\x1b[0m")
         return [negatives, positives]
@@ -0,0 +1,120 @@
+import configparser
+import os
+
+from pool import MongoConnection
+from pymongo import ASCENDING
+
+
+class Schema:
+    """
+    Declare the indexes of every collection in kdetector database, create and check them.
+    Attributes:
+        indexes: The field/options pairs to be indexed by collection.
+        queries: The representative filters to be explained by collection.
+    """
+    config = configparser.ConfigParser()
+    config_path = os.path.join(os.getcwd(), "config.ini")
+    config.read(config_path)
+    # MongoDB
+    host = config.get("mongodb", "host")
+    port = config.getint("mongodb", "port")
+    # Bugzilla
+    ttl = config.getint("bugzilla", "ttl", fallback=7 * 24 * 3600)
+    indexes = {
+        "dataset": [("md5sum", {"unique": True}), ("test_id", {}), ("bug_id", {}), ("time_stamp", {})],
+        "component": [("path", {"unique": True})],
+        "basename": [("name", {"unique": True})],
+        "function": [("function", {"unique": True}), ("header", {})],
+        "header": [("path", {"unique": True}), ("functions", {})],
+        "prefix": [("prefix", {"unique": True})],
+        "inverted": [("component", {"unique": True})],
+        "bug": [("bug_id", {"unique": True}), ("updated", {"expireAfterSeconds": ttl})]
+    }
+    queries = {
+        "dataset": [{"md5sum": ""}, {"test_id": {"$in": [0]}}, {"time_stamp": {"$lt": 0}}],
+        "component": [{"path": ""}],
+        "basename": [{"name": ""}],
+        "function": [{"function": ""}, {"function": "", "header": ""}],
+        "header": [{"path": ""}, {"functions": ""}],
+        "prefix": [{"prefix": {"$in": [""]}}],
+        "inverted": [{"component": {"$in": [""]}}],
+        "bug": [{"bug_id": {"$in": [0]}}]
+    }
+
+    def create_indexes(self, collection, name):
+        """
+        Create the declared indexes on a collection, which is a no-op for existing ones.
+        Args:
+            collection: The collection to be indexed.
+            name: The declared collection name, which differs from the collection being built aside.
+        """
+        for field, options in self.indexes[name]:
+            collection.create_index([(field, ASCENDING)], **options)
+
+    def swap(self, database, name):
+        """
+        Index the collection built aside and atomically rename it over the target collection.
+        Args:
+            database: The kdetector database.
+            name: The target collection name, built aside as "<name>_build".
+        Returns:
+            Whether the target collection was replaced, which is not the case for an empty build.
+        """
+        build = database[f"{name}_build"]
+        if build.find_one({}, {"_id": 1}) is None:
+            build.drop()
+            return False
+        self.create_indexes(build, name)
+        build.rename(name, dropTarget=True)
+        return True
+
+    @staticmethod
+    def scanned(plan):
+        """
+        Check whether a query plan falls back to a collection scan.
+        Args:
+            plan: The winning plan in explain output.
+        Returns:
+            Whether any stage is a collection scan.
+        """
+        stack = [plan]
+        # DFS
+        while stack:
+            stage = stack.pop()
+            if stage.get("stage") == "COLLSCAN":
+                return True
+            if "inputStage" in stage:
+                stack.append(stage["inputStage"])
+            stack.extend(stage.get("inputStages", []))
+        return False
+
+    def check(self):
+        """
+        Report missing indexes and representative queries which fall back to a collection scan.
+        Returns:
+            The number of problems found.
+        """
+        problems = 0
+        with MongoConnection(self.host, self.port) as mongo:
+            database = mongo.connection["kdetector"]
+            existing = set(database.list_collection_names())
+            for name in self.indexes:
+                if name not in existing:
+                    print(f"{name}: not created yet")
+                    continue
+                collection = database[name]
+                keys = {tuple(i["key"]) for i in collection.index_information().values()}
+                for field, _ in self.indexes[name]:
+                    if ((field, ASCENDING),) not in keys:
+                        problems += 1
+                        print(f"\x1b[31m{name}: missing index on {field}\x1b[0m")
+                for query in self.queries[name]:
+                    plan = collection.find(query).explain()
+                    stats = plan.get("executionStats", dict())
+                    if self.scanned(plan["queryPlanner"]["winningPlan"]):
+                        problems += 1
+                        print(f"\x1b[31m{name}: {query} scans {stats.get('totalDocsExamined', '?')} documents "
+                              f"in {stats.get('executionTimeMillis', '?')} ms\x1b[0m")
+        if not problems:
+            print("\x1b[32mSuccessfully checked indexes and queries.\x1b[0m")
+        return problems
@@ -0,0 +1,84 @@
+import configparser
+import heapq
+import os
+
+from calculate import Calculate
+from detect import Detect
+from inverted import InvertedIndex
+from log import Log
+from pool import MongoConnection
+
+
+class Search:
+    """
+    Search the most similar crash dumps in dataset through the mathematical model.
+    Attributes:
+        param: A possible parameter (i.e., test_id, dump_path) that has crash failure.
+        top_k: The number of best matched crash dumps to be returned.
+    """
+    config = configparser.ConfigParser()
+    config_path = os.path.join(os.getcwd(), "config.ini")
+    config.read(config_path)
+    # MongoDB
+    host = config.get("mongodb", "host")
+    port = config.getint("mongodb", "port")
+
+    def __init__(self, param, top_k):
+        self.param = param
+        self.top_k = top_k
+
+    def candidate(self, cpnt_order, heap):
+        """
+        Stream candidate documents from dataset, skipping those which cannot enter the top-K.
+        Args:
+            cpnt_order: The component sequence of the query.
+            heap: The current top-K matches.
+        Returns:
+            The candidate documents.
+        """
+        projection = {"_id": 0, "test_id": 1, "bug_id": 1, "cpnt_order": 1, "func_block": 1}
+        index = InvertedIndex()
+        with MongoConnection(self.host, self.port) as mongo:
+            collection = mongo.connection["kdetector"]["dataset"]
+            # scan the whole dataset without inverted index
+            if not index.is_built():
+                yield from collection.find({}, projection)
+                return
+            candidates = index.shortlist(cpnt_order)
+            batch = max(self.top_k, 100)
+            for i in range(0, len(candidates), batch):
+                chunk = candidates[i:i+batch]
+                documents = dict()
+                for data in collection.find({"test_id": {"$in": [c[1] for c in chunk]}}, projection):
+                    documents[data["test_id"]] = data
+                for bound, test_id in chunk:
+                    # the remaining candidates cannot beat the current cut-off
+                    if len(heap) >= self.top_k and bound < heap[0][0]:
+                        return
+                    if test_id in documents:
+                        yield documents[test_id]
+
+    def search_sim(self):
+        """
+        Score the crash dump against every document in dataset and output the top-K matches.
+        Returns:
+            The top-K matches composed of similarity, test_id and bug_id.
+        """
+        cpnt_order, func_block = Detect.obtain_knowledge(self.param)
+        heap = []
+        for count, data in enumerate(self.candidate(cpnt_order, heap)):
+            # skip the crash dump itself
+            if str(data["test_id"]) == self.param:
+                continue
+            order_pair = [cpnt_order, data["cpnt_order"]]
+            block_pair = [func_block, data["func_block"]]
+            sim = Calculate(order_pair, block_pair).calculate_sim()
+            # earlier candidates win on equal similarity
+            item = (sim, -count, data["test_id"], data["bug_id"])
+            if len(heap) < self.top_k:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+        matches = [(sim, test_id, bug_id) for sim, _, test_id, bug_id in sorted(heap, reverse=True)]
+        Log().search_print(matches)
+        return matches
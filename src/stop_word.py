@@ -39,26 +39,29 @@ class StopWord:
         word_list = []
         result = ETL().extract_word()
         count, total = 0, len(result)
-        for row in result:
-            count += 1
-            test_id = row[0]
-            print(f"{test_id}, {count}/{total}")
-            try:
-                dump = ETL().extract_cdb(test_id)
-                processed = Process(dump).internal_process()
-            except (IndexError, UnicodeDecodeError):
-                continue
-            if "\n\n" in dump:
-                exceptions = dump[dump.index("\n\n") + len("\n\n"):]
-                try:
-                    header = "exception throw location:\n"
-                    stack = exceptions[exceptions.index(header) + len(header):]
-                except ValueError:
+        for i in range(0, total, ETL.chunk):
+            chunk = result[i:i+ETL.chunk]
+            # extract history data in batch
+            history = ETL().extract_cdbs([row[0] for row in chunk])
+            for row in chunk:
+                count += 1
+                test_id = row[0]
+                print(f"{test_id}, {count}/{total}")
+                dump = history.get(test_id)
+                if dump is None:
                     continue
-                # extract root cause from exceptions
-                if dump.count(header) > 1:
-                    stack = stack[:stack.index("\n\n")]
-                roots = re.findall(r"^\d+:[ ](.+)[ ]at[ ].+", stack, re.M)
-                words = self.obtain_word(roots, processed)
-                word_list += words
+                processed = Process(dump).internal_process()
+                if "\n\n" in dump:
+                    exceptions = dump[dump.index("\n\n") + len("\n\n"):]
+                    try:
+                        header = "exception throw location:\n"
+                        stack = exceptions[exceptions.index(header) + len(header):]
+                    except ValueError:
+                        continue
+                    # extract root cause from exceptions
+                    if dump.count(header) > 1:
+                        stack = stack[:stack.index("\n\n")]
+                    roots = re.findall(r"^\d+:[ ](.+)[ ]at[ ].+", stack, re.M)
+                    words = self.obtain_word(roots, processed)
+                    word_list += words
         Log().chart_print(Counter(word_list).most_common(10))
@@ -13,6 +13,9 @@ class Train:
     Training for parameter tuning which contains data sampling.
     Attributes:
         dataset: The sampled dataset.
+        documents: The documents referenced by the sampled dataset.
+        features: Feature values of position and distance for each sample.
+        max_lens: The longer length of 2 component sequences for each sample.
     """
     config = configparser.ConfigParser()
     config_path = os.path.join(os.getcwd(), "config.ini")
@@ -23,24 +26,49 @@ class Train:
 
     def __init__(self):
         self.dataset = Sample().sample_data()
+        self.documents = self.load_document()
+        self.features, self.max_lens = self.extract_feature()
 
-    def predict_score(self, sample, m, n):
+    def load_document(self):
         """
-        Calculate the predicted score for each sample.
-        Args:
-            sample: A sample in the dataset.
-            m: The parameter for component position.
-            n: The parameter for component distance.
+        Load every document referenced by the sampled dataset in one query.
         Returns:
-            score: The predicted score.
+            documents: The test_id/document mapping.
         """
+        test_ids = {test_id for samples in self.dataset for sample in samples for test_id in sample}
+        projection = {"_id": 0, "test_id": 1, "cpnt_order": 1, "func_block": 1}
         with MongoConnection(self.host, self.port) as mongo:
             collection = mongo.connection["kdetector"]["dataset"]
-            src = collection.find_one({"test_id": sample[0]})
-            tgt = collection.find_one({"test_id": sample[1]})
-            order_pair = [src["cpnt_order"], tgt["cpnt_order"]]
-            block_pair = [src["func_block"], tgt["func_block"]]
-        return Calculate(order_pair, block_pair).calculate_sim(m, n)
+            cursor = collection.find({"test_id": {"$in": list(test_ids)}}, projection)
+            documents = {data["test_id"]: data for data in cursor}
+        return documents
+
+    def extract_feature(self):
+        """
+        Obtain the features of each sample once, since they do not depend on parameters.
+        Returns:
+            features: Feature values of position and distance for each sample.
+            max_lens: The longer length of 2 component sequences for each sample.
+        """
+        features, max_lens = [], []
+        print("Start feature extraction...")
+        for samples in self.dataset:
+            for sample in samples:
+                src, tgt = self.documents[sample[0]], self.documents[sample[1]]
+                order_pair = [src["cpnt_order"], tgt["cpnt_order"]]
+                block_pair = [src["func_block"], tgt["func_block"]]
+                features.append(Calculate(order_pair, block_pair).obtain_feature())
+                max_lens.append(len(max(order_pair, key=len)))
+        print(f"\x1b[32mSuccessfully extracted features ({len(features)}).\x1b[0m")
+        return features, max_lens
+
+    def true_label(self):
+        """
+        Obtain the true label for each sample.
+        Returns:
+            The true labels.
+        """
+        return array([label for label, samples in enumerate(self.dataset) for _ in samples])
 
     def draw_curve(self, m, n):
         """
@@ -51,13 +79,8 @@ class Train:
         Returns:
             The basic information, i.e., true label and predicted score.
         """
-        true_label, pred_score = [], []
-        for label, samples in enumerate(self.dataset):
-            for sample in samples:
-                score = self.predict_score(sample, m, n)
-                true_label.append(label)
-                pred_score.append(score)
-        return array(true_label), array(pred_score)
+        pred_score = Calculate.grid_sim(self.features, self.max_lens, [m], [n])[0][0]
+        return self.true_label(), pred_score
 
     def debugging(self):
         """
@@ -78,13 +101,12 @@ class Train:
         threshold = thresholds[idx]
         print(f"\nThreshold={threshold:.2%}")
         # output FP and FN
-        for label, samples in enumerate(self.dataset):
-            for sample in samples:
-                score = self.predict_score(sample, m, n)
-                if label == 0 and score >= threshold:
-                    print(f"FP: {sample[0]} {sample[1]}")
-                if label == 1 and score < threshold:
-                    print(f"FN: {sample[0]} {sample[1]}")
+        samples = [sample for samples in self.dataset for sample in samples]
+        for label, score, sample in zip(true_label, pred_score, samples):
+            if label == 0 and score >= threshold:
+                print(f"FP: {sample[0]} {sample[1]}")
+            if label == 1 and score < threshold:
+                print(f"FN: {sample[0]} {sample[1]}")
         print("\n", end="")
 
     def training(self):
@@ -93,10 +115,13 @@ class Train:
         """
         ap_max = m_opt = n_opt = 0.0
         print("Start parameter tuning...")
-        for m in arange(0.0, 2.1, 0.1):
-            for n in arange(0.0, 2.1, 0.1):
-                true_label, pred_score = self.draw_curve(m, n)
-                ap = average_precision_score(true_label, pred_score)
+        ms = ns = arange(0.0, 2.1, 0.1)
+        true_label = self.true_label()
+        # score the whole grid at once
+        pred_score = Calculate.grid_sim(self.features, self.max_lens, ms, ns)
+        for i, m in enumerate(ms):
+            for j, n in enumerate(ns):
+                ap = average_precision_score(true_label, pred_score[i][j])
                 print(f"m={m:.1f}, n={n:.1f}, AP={ap:.3f}")
                 if ap > ap_max:
                     ap_max, m_opt, n_opt = ap, m, n
@@ -13,39 +13,75 @@ class DP:
             The position information of longest common subsequence.
         """
         m, n = len(seq1), len(seq2)
-        # initialize
-        dp = [[[] for _ in range(n + 1)] for _ in range(m + 1)]
+        # initialize lengths over suffixes
+        dp = [[0] * (n + 1) for _ in range(m + 1)]
         # fill
         for i in range(1, m + 1):
+            prev, curr, item = dp[i-1], dp[i], seq1[m-i]
             for j in range(1, n + 1):
-                # top first
-                if seq1[m-i] == seq2[n-j]:
-                    dp[i][j] = dp[i-1][j-1] + [(m - i, n - j)]
+                if item == seq2[n-j]:
+                    curr[j] = prev[j-1] + 1
                 else:
-                    # column preference
-                    dp[i][j] = max(dp[i][j-1], dp[i-1][j], key=len)
-        return dp[-1][-1][::-1]
+                    curr[j] = curr[j-1] if curr[j-1] >= prev[j] else prev[j]
+        # backtrack
+        positions = []
+        i, j = m, n
+        while i and j:
+            # top first
+            if seq1[m-i] == seq2[n-j]:
+                positions.append((m - i, n - j))
+                i, j = i - 1, j - 1
+            # column preference
+            elif dp[i][j-1] >= dp[i-1][j]:
+                j -= 1
+            else:
+                i -= 1
+        return positions
 
     @staticmethod
-    def normalized_dist(seq1, seq2):
+    def normalized_dist(seq1, seq2, bound=None):
         """
-        Obtain the normalized distance between two sequences.
+        Obtain the normalized distance between two sequences via bit-parallel algorithm (Myers/Hyyro).
         Args:
             seq1: A sequence to be iterated.
             seq2: A sequence to be iterated.
+            bound: Stop early once the normalized distance must exceed it.
         Returns:
-            The normalized distance between two sequences.
+            The normalized distance between two sequences, or None if it exceeds bound.
         """
         m, n = len(seq1), len(seq2)
-        # initialize
-        dp = [[i + j for j in range(n + 1)] for i in range(m + 1)]
-        # fill
-        for i in range(1, m + 1):
-            for j in range(1, n + 1):
-                dist = 1 if seq1[i-1] != seq2[j-1] else 0
-                dp[i][j] = min(dp[i-1][j-1] + dist,
-                               min(dp[i-1][j], dp[i][j-1]) + 1)
-        return dp[-1][-1] / max(m, n)
+        len_max = max(m, n)
+        limit = None if bound is None else bound * len_max
+        if limit is not None and abs(m - n) > limit:
+            return None
+        if not m:
+            return n / len_max
+        # bit mask of positions for each token
+        peq = dict()
+        for i, item in enumerate(seq1):
+            peq[item] = peq.get(item, 0) | (1 << i)
+        full, high = (1 << m) - 1, 1 << (m - 1)
+        pv, mv, dist = full, 0, m
+        for j, item in enumerate(seq2):
+            eq = peq.get(item, 0)
+            xv = eq | mv
+            xh = (((eq & pv) + pv) ^ pv) | eq
+            ph = mv | ~(xh | pv)
+            mh = pv & xh
+            if ph & high:
+                dist += 1
+            elif mh & high:
+                dist -= 1
+            # the distance decreases at most once per remaining column
+            if limit is not None and dist - (n - j - 1) > limit:
+                return None
+            ph = (ph << 1) | 1
+            mh = mh << 1
+            pv = (mh | ~(xv | ph)) & full
+            mv = ph & xv & full
+        if limit is not None and dist > limit:
+            return None
+        return dist / len_max
 
 
 class UF:
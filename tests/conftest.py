@@ -0,0 +1,7 @@
+import os
+import sys
+
+# modules are flat under src and read config.ini from the working directory at import time
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(TESTS_DIR), "src"))
+os.chdir(TESTS_DIR)
@@ -0,0 +1,25 @@
+#pragma once
+
+namespace outer {
+namespace {
+void hidden(int);
+}
+namespace inner {
+class Widget {
+public:
+    Widget();
+    ~Widget();
+    operator bool() const;
+    int size() const { int x = 0; for (int i = 0; i < 3; ++i) x += i; return x; }
+    int size2() const;
+    template <typename T> T get(T t) { return t; }
+    struct Nested { void go(); };
+};
+inline void Widget::Nested::go() {}
+void free_fn(int v);
+}
+inline int inner::Widget::size2() const { return 0; }
+}
+extern "C" { void c_api(); }
+void outer::inner::free_fn(int v) {}
+static void local_holder() { struct Local { void method() {} }; }
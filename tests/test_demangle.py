@@ -0,0 +1,54 @@
+import shutil
+import subprocess
+
+import pytest
+
+from demangle import Demangler
+
+pytestmark = pytest.mark.skipif(shutil.which("c++filt") is None, reason="c++filt is not installed")
+
+SYMBOLS = [
+    "_ZN5ptime5Query4execEi",
+    "_ZNSt9exceptionD2Ev@@GLIBCXX_3.4",
+    "_ZN3fooC2Ev@plt",
+    "_ZNK3Foo3barEv const",
+    "_ZN9TRexUtils6ParserC1ERKS0_",
+    "_Z1fv",
+    "not_mangled",
+]
+
+
+def reference_demangle(symbol):
+    """
+    The original per-symbol call, one command line argument per token.
+    """
+    pipe = subprocess.run(["c++filt", "-p"] + symbol.split(" "), stdout=subprocess.PIPE)
+    return pipe.stdout.decode("utf-8")[:-1]
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(Demangler, "cache", None)
+    monkeypatch.setattr(Demangler, "recent", dict())
+    monkeypatch.setattr(Demangler, "cache_path", "")
+
+
+def test_versioned_and_plt_symbols():
+    ret = Demangler().demangle(SYMBOLS)
+    # suffixes are dropped as with a command line argument
+    assert ret["_ZNSt9exceptionD2Ev@@GLIBCXX_3.4"] == "std::exception::~exception"
+    assert ret["_ZN3fooC2Ev@plt"] == "foo::foo"
+
+
+def test_matches_per_symbol_calls():
+    ret = Demangler().demangle(SYMBOLS)
+    assert ret == {i: reference_demangle(i) for i in SYMBOLS}
+
+
+def test_batches_within_limit(monkeypatch):
+    monkeypatch.setattr(Demangler, "arg_limit", 40)
+    batches = list(Demangler.batches(SYMBOLS))
+    assert len(batches) > 1
+    assert [s for batch in batches for s, _ in batch] == SYMBOLS
+    ret = Demangler().demangle(SYMBOLS)
+    assert ret == {i: reference_demangle(i) for i in SYMBOLS}
@@ -0,0 +1,49 @@
+import os
+
+import pytest
+
+clang = pytest.importorskip("clang.cindex")
+
+from component import Component  # noqa: E402
+from function import Function  # noqa: E402
+
+HEADER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "widget.h")
+
+EXPECTED = {
+    "outer::::hidden",
+    "outer::inner::Widget::Widget",
+    "outer::inner::Widget::~Widget",
+    "outer::inner::Widget::operator bool",
+    "outer::inner::Widget::size",
+    "outer::inner::Widget::size2",
+    "outer::inner::Widget::Nested::go",
+    "outer::inner::free_fn",
+    "c_api",
+    "local_holder",
+}
+
+
+@pytest.fixture(autouse=True)
+def no_database(monkeypatch):
+    # resolve components without MongoDB
+    monkeypatch.setattr(Component, "mapping", dict())
+    try:
+        clang.Index.create()
+    except Exception as e:
+        pytest.skip(f"libclang is not loadable: {e}")
+
+
+def find_function(monkeypatch, fast):
+    monkeypatch.setattr(Function, "fast", fast)
+    return Function().find_function(HEADER)
+
+
+def test_scoped_walk(monkeypatch):
+    assert set(find_function(monkeypatch, True)) == EXPECTED
+
+
+def test_scoped_walk_matches_full_walk(monkeypatch):
+    full = set(find_function(monkeypatch, False))
+    # classes local to function bodies are skipped along with the bodies
+    assert full - set(find_function(monkeypatch, True)) == {"local_holder::Local::method"}
+    assert full - {"local_holder::Local::method"} == EXPECTED
@@ -0,0 +1,124 @@
+import io
+import random
+import re
+import time
+
+import pytest
+
+from process import Process
+
+
+def reference_pre_process(dump):
+    """
+    The original regex parser, kept as the reference for the single-pass version.
+    """
+    stack_pattern = re.compile(r"\n(\[CRASH_STACK][\s\S]+)\[CRASH_REGISTERS]", re.M)
+    stack = stack_pattern.findall(dump)[0]
+    pattern = re.compile(r"-\n[ ]*\d+:[ ](.+)[^-]+Source:[ ](.+):", re.M)
+    for function, path in pattern.findall(stack):
+        yield [re.sub(r"([ ]const)*[ ][+][ ]0x\w+", "", function), path]
+
+
+def parse(generator):
+    try:
+        return list(generator)
+    except IndexError:
+        return IndexError
+
+
+def random_frame(rng, number):
+    function = rng.choice([
+        "ptime::Query::exec(int) const + 0x1f3",
+        "TRexCommonObjects::Foo::bar() + 0x10",
+        "std::vector<int>::push_back(int const&) const const + 0xab",
+        "operator-(a, b)",
+        "x",
+        # source within the frame line itself
+        "foo() Source: inline.cc:1",
+        "foo()-Source: dashed.cc:2",
+        "Source: leading.cc:3",
+        "f Source: nocolon",
+        "g Source: a.cc:4 - tail",
+        "h Source: b.cc:5 Source: c.cc:6",
+    ])
+    lines = [f"{' ' * rng.randint(0, 3)}{number}: {function}",
+             "       Symbol: _ZN5ptime5Query4execEi",
+             "       SFrame: IP: 0x7f (0x1+0x2) FP: 0x3 SP: 0x4 RP: 0x5"]
+    if rng.random() < .2:
+        lines.append("       Params: -1")
+    if rng.random() < .7:
+        lines.append("       Source: " + rng.choice(["Query.cc:123", "a-b.cc:4", "c:/x/y.h:9", "nocolon",
+                                                     "Source: z.cc:1"]))
+    if rng.random() < .2:
+        lines.append("       Source: second.cc:7")
+    lines.append("       Module: libhdbbasis.so")
+    return lines
+
+
+def random_dump(rng):
+    lines = ["[BUILD]", "version 2.00"]
+    if rng.random() < .95:
+        lines.append("[CRASH_STACK]  Stacktrace of crash: (2020-01-01 10:00:00)")
+    lines.append("----> Symbolic stack backtrace <----")
+    for number in range(rng.randint(0, 8)):
+        lines += random_frame(rng, number)
+        lines.append(rng.choice(["-" * 40, "-" * 40, "--- x", ""]))
+    if rng.random() < .95:
+        lines.append(rng.choice(["[CRASH_REGISTERS]", "tail [CRASH_REGISTERS] more",
+                                 " 9: f Source: end.cc:1 [CRASH_REGISTERS]"]))
+    lines += ["rax: 0x0", "-" * 5]
+    text = list("\n".join(lines))
+    # random mutations
+    for _ in range(rng.randint(0, 4)):
+        text[rng.randrange(len(text))] = rng.choice(["-", "\n", " ", ":", "0", "S"])
+    return "head\n" + "".join(text)
+
+
+def random_dumps(seed, count):
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield random_dump(rng)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_pre_process_matches_reference(seed):
+    for dump in random_dumps(seed, 2000):
+        expected = parse(reference_pre_process(dump))
+        assert parse(Process(dump).pre_process()) == expected, dump
+        assert parse(Process(dump.encode("utf-8")).pre_process()) == expected, dump
+        assert parse(Process(io.BytesIO(dump.encode("utf-8"))).pre_process()) == expected, dump
+
+
+def test_read_stack_matches_reference(tmp_path):
+    path = tmp_path / "crashdump.trc"
+    for dump in random_dumps(4, 300):
+        expected = parse(reference_pre_process(dump))
+        path.write_bytes(dump.encode("utf-8"))
+        # stack_slice keeps the stack from its start marker, so only dumps with a stack are comparable
+        if expected is not IndexError:
+            assert parse(Process(Process.read_stack(path)).pre_process()) == expected, dump
+        with open(path, "rb") as fp:
+            assert parse(Process(fp).pre_process()) == expected, dump
+
+
+def test_source_in_frame_line():
+    dump = ("head\n[CRASH_STACK]\n-\n"
+            " 0: foo() + 0x1 Source: inline.cc:1\n  Module: x\n-\n"
+            " 1: bar() Source: ignored.cc:2\n  Source: b.cc:3\n-\n"
+            " 2: baz() Source: end.cc:4 [CRASH_REGISTERS]\n")
+    assert list(Process(dump).pre_process()) == list(reference_pre_process(dump)) == [
+        ["foo()", "inline.cc"], ["bar() Source: ignored.cc:2", "b.cc"], ["baz()", "end.cc"]]
+
+
+def test_missing_sections():
+    for dump in ("head\nno stack\n", "head\n[CRASH_STACK]\n-\n 0: f\n Source: a.cc:1\n"):
+        assert parse(reference_pre_process(dump)) is IndexError
+        assert parse(Process(dump).pre_process()) is IndexError
+
+
+def test_pre_process_worst_case():
+    # frame lines followed by long dash-free blocks backtrack quadratically in the reference
+    dump = "head\n[CRASH_STACK]\n" + ("-\n 1: " + "f" * 2000 + "\n" + "a" * 2000 + "\n") * 500 + "[CRASH_REGISTERS]\n"
+    start = time.perf_counter()
+    assert list(Process(dump).pre_process()) == []
+    assert time.perf_counter() - start < 1
@@ -0,0 +1,74 @@
+import random
+
+import pytest
+
+from utils import DP
+
+
+def reference_lcs_position(seq1, seq2):
+    """
+    The original list-of-lists implementation, kept as the reference for tie-breaking.
+    """
+    m, n = len(seq1), len(seq2)
+    dp = [[[] for _ in range(n + 1)] for _ in range(m + 1)]
+    for i in range(1, m + 1):
+        for j in range(1, n + 1):
+            if seq1[m-i] == seq2[n-j]:
+                dp[i][j] = dp[i-1][j-1] + [(m - i, n - j)]
+            else:
+                dp[i][j] = max(dp[i][j-1], dp[i-1][j], key=len)
+    return dp[-1][-1][::-1]
+
+
+def reference_normalized_dist(seq1, seq2):
+    """
+    The original Levenshtein table, kept as the reference for the bit-parallel version.
+    """
+    m, n = len(seq1), len(seq2)
+    dp = [[i + j for j in range(n + 1)] for i in range(m + 1)]
+    for i in range(1, m + 1):
+        for j in range(1, n + 1):
+            dist = 1 if seq1[i-1] != seq2[j-1] else 0
+            dp[i][j] = min(dp[i-1][j-1] + dist, min(dp[i-1][j], dp[i][j-1]) + 1)
+    return dp[-1][-1] / max(m, n)
+
+
+def random_pairs(seed, count, max_len, alphabet):
+    rng = random.Random(seed)
+    for _ in range(count):
+        seq1 = [rng.choice(alphabet) for _ in range(rng.randint(0, max_len))]
+        seq2 = [rng.choice(alphabet) for _ in range(rng.randint(0, max_len))]
+        yield seq1, seq2
+
+
+@pytest.mark.parametrize("alphabet", ["ab", "abcd", "abcdefghij"])
+def test_lcs_position_matches_reference(alphabet):
+    # small alphabets produce many ties, which is where the preference order matters
+    for seq1, seq2 in random_pairs(alphabet, 3000, 12, alphabet):
+        assert DP.lcs_position(seq1, seq2) == reference_lcs_position(seq1, seq2)
+
+
+def test_lcs_position_components():
+    seq1 = ["PTIME", "TREX", "TREX", "BASIS"]
+    seq2 = ["TREX", "PTIME", "BASIS", "TREX"]
+    assert DP.lcs_position(seq1, seq2) == reference_lcs_position(seq1, seq2)
+    assert DP.lcs_position([], seq2) == []
+
+
+@pytest.mark.parametrize("alphabet", ["ab", "abcd", "abcdefghij"])
+def test_normalized_dist_matches_reference(alphabet):
+    for seq1, seq2 in random_pairs(alphabet, 1500, 60, alphabet):
+        if not seq1 and not seq2:
+            continue
+        # bit-identical, as both divide the same integer distance
+        assert DP.normalized_dist(seq1, seq2) == reference_normalized_dist(seq1, seq2)
+
+
+def test_normalized_dist_bound():
+    for seq1, seq2 in random_pairs(7, 1500, 40, "abc"):
+        if not seq1 and not seq2:
+            continue
+        expected = reference_normalized_dist(seq1, seq2)
+        for bound in (0.0, 0.25, 0.5, 1.0):
+            actual = DP.normalized_dist(seq1, seq2, bound)
+            assert actual == (expected if expected <= bound else None)